@@ -0,0 +1,120 @@
+"""Content-addressed static assets, served by the backend.
+
+``AssetCatalog`` reads the asset directory once at startup. Every file gets
+a URL with a hash of its content in the name (``characters/ch1.3f2a9c1b2d4e.png``),
+so browsers may keep it forever: a changed file gets a new URL. Text
+formats are compressed ahead of time with gzip, and with brotli when it is
+installed; images are compressed already and go out as they are. The
+manifest maps asset names to their URLs and is versioned by a hash over
+all of them.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+from pathlib import Path, PurePosixPath
+from typing import Dict, NamedTuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HASH_LENGTH = 12
+MIN_SAVING = 0.1    # a compressed variant must be this much smaller to be kept
+COMPRESSIBLE = ("text/", "application/json", "image/svg+xml")
+IMMUTABLE = "public, max-age=31536000, immutable"
+SUFFIXES = {"gzip": "gz", "br": "br"}
+
+
+class Asset(NamedTuple):
+    name: str
+    url: str
+    digest: str
+    media_type: str
+    body: bytes
+    variants: Dict[str, bytes]      # content coding -> body
+
+    def etag(self, encoding=None) -> str:
+        # Each encoding is its own representation and needs its own strong validator
+        return f'"{self.digest}-{SUFFIXES[encoding]}"' if encoding else f'"{self.digest}"'
+
+    def negotiate(self, accept_encoding: str):
+        """``(encoding, body)`` of the smallest variant the client accepts; encoding None is identity."""
+        accepted = parse_accept_encoding(accept_encoding)
+        best = (None, self.body)
+        for encoding, body in self.variants.items():
+            if accepted.get(encoding, accepted.get("*", 0)) > 0 and len(body) < len(best[1]):
+                best = (encoding, body)
+        return best
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    variants = {"gzip": gzip.compress(body, 9, mtime=0)}
+    if brotli:
+        variants["br"] = brotli.compress(body, quality=11)
+    return {encoding: data for encoding, data in variants.items() if len(data) <= len(body) * (1 - MIN_SAVING)}
+
+
+class AssetCatalog:
+    """Every file under ``directory``, addressable by name and by hashed URL under ``prefix``.
+
+    ``preload`` names the assets every client needs once the game starts;
+    it is passed on in the manifest so the lobby can fetch them early.
+    """
+
+    def __init__(self, directory: Path, prefix: str, preload=()):
+        self.assets: Dict[str, Asset] = {}
+        # Hashed file name (the URL below the prefix) -> asset
+        self.files: Dict[str, Asset] = {}
+        for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+            name = path.relative_to(directory).as_posix()
+            body = path.read_bytes()
+            digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+            posix = PurePosixPath(name)
+            file = str(posix.with_name(f"{posix.stem}.{digest}{posix.suffix}"))
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            variants = compress(body) if media_type.startswith(COMPRESSIBLE) else {}
+            asset = Asset(name, prefix + file, digest, media_type, body, variants)
+            self.assets[name] = asset
+            self.files[file] = asset
+
+        self.version = hashlib.sha256(
+            "".join(f"{a.name}:{a.digest};" for a in self.assets.values()).encode()
+        ).hexdigest()[:HASH_LENGTH]
+        self.etag = f'"{self.version}"'
+        self.manifest = {
+            "version": self.version,
+            "assets": {a.name: {"url": a.url, "size": len(a.body)} for a in self.assets.values()},
+            "preload": [name for name in preload if name in self.assets],
+        }
+        self.manifest_body = json.dumps(self.manifest).encode()
+
+    def read(self, name: str) -> bytes:
+        return self.assets[name].body
@@ -0,0 +1,373 @@
+"""Load test: many simulated players driving full games over HTTP and /ws.
+
+By default a local uvicorn running ``server:app`` is started on a free port
+and its CPU/memory sampled; ``--url`` targets a server that is already
+running (pass ``--pid`` to sample it) and ``--in-process`` serves the app from
+this process's own event loop instead.
+
+Every lobby plays the same script: everyone joins and authenticates, the
+game starts, crewmates finish tasks, a meeting is called, everyone votes and
+an impostor sabotages. The report has p50/p99 latency per endpoint, delivery
+lag per broadcast type (request sent -> message received on each socket),
+messages/sec and server CPU/memory. ``--save`` writes it as JSON and
+``--baseline`` fails the run when a p99 regresses past ``--tolerance``.
+
+    python bench/loadtest.py --lobbies 10 --players 20
+
+Needs httpx and websockets; psutil is optional and only used for server stats.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import httpx
+import websockets
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FANOUT_TIMEOUT = 30     # seconds to wait for a broadcast to reach every socket
+HEARTBEAT_INTERVAL = 10 # seconds between pings, like the real client
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Stats:
+    def __init__(self):
+        self.latency = defaultdict(list)    # "METHOD /path" -> seconds
+        self.status = defaultdict(Counter)
+        self.lag = defaultdict(list)        # message type -> seconds
+        self.received = Counter()
+        self.missed = Counter()
+
+    def summary(self, elapsed, server):
+        def pcts(values):
+            return {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "endpoints": {
+                name: {**pcts(values), "status": dict(self.status[name])}
+                for name, values in sorted(self.latency.items())
+            },
+            "broadcast_lag": {name: pcts(values) for name, values in sorted(self.lag.items())},
+            "broadcast_missed": dict(self.missed),
+            "messages": sum(self.received.values()),
+            "messages_per_s": round(sum(self.received.values()) / elapsed, 1),
+            "messages_by_type": dict(self.received.most_common()),
+            "server": server,
+        }
+
+
+class Player:
+    """One simulated client: its own cookie jar and its own socket."""
+
+    def __init__(self, base_url, stats, name):
+        self.http = httpx.AsyncClient(base_url=base_url, timeout=30)
+        self.ws_url = base_url.replace("http", "ws", 1) + "/ws"
+        self.stats = stats
+        self.name = name
+        self.id = None
+        self.room = None
+        self.role = None
+        self.tasks = []
+        self.ws = None
+        self.reader = None
+        self.heartbeat = None
+        self.waiters = defaultdict(list)
+
+    async def request(self, method, path, **kwargs):
+        name = f"{method} {path}"
+        start = time.perf_counter()
+        response = await self.http.request(method, path, **kwargs)
+        self.stats.latency[name].append(time.perf_counter() - start)
+        self.stats.status[name][response.status_code] += 1
+        return response
+
+    async def join(self, room=None):
+        data = (await self.request("POST", "/api/join", json={"name": self.name, "room": room})).json()
+        self.id = data["playerId"]
+        self.room = data["room"]
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.ws_url, max_queue=None)
+        await self.ws.send(json.dumps({"type": "auth", "player_id": self.id, "room": self.room}))
+        self.reader = asyncio.create_task(self.read())
+        self.heartbeat = asyncio.create_task(self.ping())
+
+    async def ping(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await self.ws.send(json.dumps({"type": "ping"}))
+
+    async def read(self):
+        try:
+            async for raw in self.ws:
+                received = time.perf_counter()
+                message = json.loads(raw)
+                kind = message.get("type", "error")
+                self.stats.received[kind] += 1
+                if kind == "role_assigned":
+                    self.role = message["role"]
+                for future in self.waiters.pop(kind, ()):
+                    if not future.done():
+                        future.set_result(received)
+        except websockets.ConnectionClosed:
+            pass
+
+    def expect(self, kind):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[kind].append(future)
+        return future
+
+    async def close(self):
+        if self.heartbeat:
+            self.heartbeat.cancel()
+        if self.ws:
+            await self.ws.close()
+        if self.reader:
+            await self.reader
+        await self.http.aclose()
+
+
+class Lobby:
+    def __init__(self, base_url, stats, size, tasks_per_player):
+        self.stats = stats
+        self.tasks_per_player = tasks_per_player
+        self.players = [Player(base_url, stats, f"bot{i}") for i in range(size)]
+
+    async def fanout(self, kind, trigger, record=True):
+        """Run ``trigger`` and time how long ``kind`` takes to reach every socket."""
+        futures = [p.expect(kind) for p in self.players]
+        start = time.perf_counter()
+        await trigger
+        done, pending = await asyncio.wait(futures, timeout=FANOUT_TIMEOUT)
+        if record:
+            for future in done:
+                self.stats.lag[kind].append(future.result() - start)
+        if pending:
+            self.stats.missed[kind] += len(pending)
+        for future in pending:
+            future.cancel()
+
+    async def play(self):
+        leader, *others = self.players
+        await leader.join()
+        await asyncio.gather(*(p.join(leader.room) for p in others))
+        await asyncio.gather(*(p.connect() for p in self.players))
+
+        await self.fanout("game_start", leader.request("POST", "/api/start"))
+        await asyncio.gather(*(self.load_game(p) for p in self.players))
+
+        crew = [p for p in self.players if p.role != "Impostor"]
+        impostors = [p for p in self.players if p.role == "Impostor"]
+        await asyncio.gather(*(self.do_tasks(p) for p in crew))
+
+        caller = random.choice(crew)
+        # vote_started comes after the meeting countdown, which is not lag
+        await self.fanout("vote_started", self.fanout("emergency_flash", caller.request("POST", "/api/emergency/call")),
+                          record=False)
+        # Everyone skips; the last vote resolves the meeting
+        *early, last = self.players
+        for voter in early:
+            await self.fanout("vote_cast", voter.request("POST", "/api/vote", json={"voterId": voter.id, "targetId": None}))
+        await self.fanout("results", last.request("POST", "/api/vote", json={"voterId": last.id, "targetId": None}))
+
+        if impostors:
+            await self.fanout("sabotage_active", impostors[0].request("POST", "/api/sabotage"))
+        await asyncio.gather(*(p.request("GET", "/api/sabotage") for p in self.players))
+
+    async def load_game(self, player):
+        tasks = (await player.request("GET", "/api/tasks")).json()["tasks"]
+        player.tasks = [t["id"] for t in tasks]
+        await player.request("GET", "/api/players")
+        await player.request("GET", "/api/global-progress")
+
+    async def do_tasks(self, player):
+        for task_id in player.tasks[:self.tasks_per_player]:
+            await player.request("POST", "/api/update-task", json={"playerId": player.id, "taskId": task_id, "done": True})
+            await player.request("GET", "/api/global-progress")
+
+    async def close(self):
+        await asyncio.gather(*(p.close() for p in self.players), return_exceptions=True)
+
+
+class ResourceSampler:
+    """Samples CPU% and RSS of the server process while the run lasts."""
+
+    def __init__(self, pid, interval=0.5):
+        self.process = psutil.Process(pid) if psutil and pid else None
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self.task = None
+
+    def start(self):
+        if self.process:
+            self.process.cpu_percent()
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.cpu.append(self.process.cpu_percent())
+            self.rss.append(self.process.memory_info().rss)
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        if not self.cpu:
+            return {"note": "not sampled" if psutil else "psutil not installed"}
+        return {
+            "cpu_mean_pct": round(statistics.mean(self.cpu), 1),
+            "cpu_max_pct": round(max(self.cpu), 1),
+            "rss_max_mb": round(max(self.rss) / 2**20, 1),
+        }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(base_url, timeout=20):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/api/global-progress")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {base_url} did not come up")
+
+
+async def run(args):
+    server_proc = server_task = None
+    pid = args.pid
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        if args.in_process:
+            import uvicorn
+            sys.path.insert(0, str(BACKEND_DIR))
+            server = uvicorn.Server(uvicorn.Config("server:app", port=port, log_level="warning"))
+            server_task = asyncio.create_task(server.serve())
+            pid = os.getpid()
+        else:
+            server_proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+                cwd=BACKEND_DIR,
+                stdout=subprocess.DEVNULL,
+            )
+            pid = server_proc.pid
+    await wait_until_up(base_url)
+
+    stats = Stats()
+    sampler = ResourceSampler(pid)
+    lobbies = [Lobby(base_url, stats, args.players, args.tasks) for _ in range(args.lobbies)]
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(lobby.play() for lobby in lobbies), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        server_stats = await sampler.stop()
+    finally:
+        await asyncio.gather(*(lobby.close() for lobby in lobbies))
+        if server_task:
+            server.should_exit = True
+            await server_task
+        if server_proc:
+            server_proc.terminate()
+            server_proc.wait()
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    for failure in failures:
+        print(f"Lobby failed: {failure!r}")
+    report = stats.summary(elapsed, server_stats)
+    report["lobbies"] = args.lobbies
+    report["players_per_lobby"] = args.players
+    report["failed_lobbies"] = len(failures)
+    return report
+
+
+def print_report(report):
+    print(f"{report['lobbies']} lobbies x {report['players_per_lobby']} players in {report['elapsed_s']} s "
+          f"({report['failed_lobbies']} failed)")
+    print(f"\n{'endpoint':32} {'count':>7} {'p50 ms':>9} {'p99 ms':>9}  status")
+    for name, row in report["endpoints"].items():
+        print(f"{name:32} {row['count']:>7} {row['p50_ms']:>9} {row['p99_ms']:>9}  {row['status']}")
+    print(f"\n{'broadcast':32} {'count':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, row in report["broadcast_lag"].items():
+        print(f"{name:32} {row['count']:>7} {row['p50_ms']:>9} {row['p99_ms']:>9}")
+    if report["broadcast_missed"]:
+        print(f"missed: {report['broadcast_missed']}")
+    print(f"\nmessages: {report['messages']} ({report['messages_per_s']}/s)")
+    print(f"server: {report['server']}")
+
+
+def regressions(report, baseline, tolerance):
+    """p99 values that got worse than the baseline by more than ``tolerance``."""
+    found = []
+    for section in ("endpoints", "broadcast_lag"):
+        for name, row in report[section].items():
+            old = baseline.get(section, {}).get(name)
+            if old and row["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+                found.append(f"{section} {name}: p99 {old['p99_ms']} -> {row['p99_ms']} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lobbies", type=int, default=5)
+    parser.add_argument("--players", type=int, default=10, help="players per lobby (server max is 20)")
+    parser.add_argument("--tasks", type=int, default=5, help="tasks each crewmate completes")
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="server pid to sample with --url")
+    parser.add_argument("--in-process", action="store_true", help="serve the app from this event loop")
+    parser.add_argument("--save", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare p99s against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        found = regressions(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+    if report["failed_lobbies"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
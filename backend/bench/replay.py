@@ -0,0 +1,61 @@
+"""Replay a recorded game log at full speed, e.g. to profile the game logic.
+
+Every event of the log goes through the same ``on_<kind>`` handlers the
+server runs, inside transactions on the memory store, without sockets or
+timers. Snapshots are ignored so the whole session is replayed.
+
+    python bench/replay.py game_logs/ABCD-<uid>.closed.jsonl --repeat 200
+    python bench/replay.py game_logs/ABCD-<uid>.jsonl --profile
+"""
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+# A replay must not write logs of its own or touch a shared database
+os.environ["EVENT_LOG_DIR"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["STATE_STORE"] = "memory"
+import server  # noqa: E402
+
+
+def replay(path, repeat):
+    room = None
+    for i in range(repeat):
+        code = f"R{i}"
+        room = server.replay_game(path, code=code, snapshot=False)
+        server.store.delete(code)
+        server.rooms.pop(code, None)
+    return room
+
+
+def main(args):
+    path = Path(args.log)
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    started = time.perf_counter()
+    room = replay(path, args.repeat)
+    elapsed = time.perf_counter() - started
+    if args.profile:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+    events = room.events * args.repeat
+    print(f"{path.name}: {room.events} events x {args.repeat} in {elapsed:.3f}s "
+          f"({events / elapsed:,.0f} events/s)")
+    print(f"final state: {room.game_state}, {len(room.connected_players)} players, "
+          f"{room.alive_count} alive, progress {room.calc_global_progress()}%, winner {room.winner()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="path of a <code>-<uid>.jsonl game log")
+    parser.add_argument("--repeat", type=int, default=1, help="replays of the log")
+    parser.add_argument("--profile", action="store_true", help="print a cProfile report of the replays")
+    main(parser.parse_args())
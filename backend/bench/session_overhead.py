@@ -0,0 +1,120 @@
+"""Per-request cost of Starlette's SessionMiddleware vs. the compact player token.
+
+Both variants serve the same tiny endpoint that looks up the player id and
+room of the caller, called straight through ASGI so only the app and its
+middleware are measured. The session cookie is filled the way the old server
+did it (join keys plus whatever /api/update-session stored) and is re-signed
+on every response; the token is verified and never rewritten.
+
+    python bench/session_overhead.py --requests 20000
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tokens import TokenSigner  # noqa: E402
+
+SECRET = "bench-secret"
+PLAYER_ID = str(uuid.uuid4())
+ROOM = "ABCD"
+SESSION = {
+    "player_id": PLAYER_ID,
+    "name": "Player One",
+    "room": ROOM,
+    # Keys the client used to push through /api/update-session
+    "role": "Crewmate",
+    "character": "ch3.png",
+    "is_ghost": False,
+    "game_state": "game",
+}
+
+signer = TokenSigner(SECRET, 3600)
+
+
+async def session_endpoint(request):
+    return PlainTextResponse(f"{request.session.get('player_id')} {request.session.get('room')}")
+
+
+async def token_endpoint(request):
+    player_id, room = signer.verify(request.cookies.get("player", "")) or (None, None)
+    return PlainTextResponse(f"{player_id} {room}")
+
+
+async def seed_session(request):
+    request.session.update(SESSION)
+    return PlainTextResponse("ok")
+
+
+session_app = Starlette(
+    routes=[Route("/", session_endpoint), Route("/seed", seed_session)],
+    middleware=[Middleware(SessionMiddleware, secret_key=SECRET)],
+)
+token_app = Starlette(routes=[Route("/", token_endpoint)])
+
+
+async def call(app, path, cookie):
+    """One GET through the ASGI app; returns (status, Set-Cookie header or None)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    result = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            for name, value in message["headers"]:
+                if name == b"set-cookie":
+                    result["set_cookie"] = value.decode()
+
+    await app(scope, receive, send)
+    return result.get("status"), result.get("set_cookie")
+
+
+async def measure(app, cookie, requests):
+    for _ in range(min(1000, requests)):
+        await call(app, "/", cookie)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, "/", cookie)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests):
+    _, set_cookie = await call(session_app, "/seed", "")
+    session_cookie = set_cookie.split(";", 1)[0]
+    token_cookie = f"player={signer.issue(PLAYER_ID, ROOM)}"
+
+    _, rewritten = await call(session_app, "/", session_cookie)
+    _, token_rewritten = await call(token_app, "/", token_cookie)
+
+    session_us = await measure(session_app, session_cookie, requests)
+    token_us = await measure(token_app, token_cookie, requests)
+    bare_us = await measure(token_app, "", requests)
+
+    print(f"{'variant':16} {'cookie bytes':>13} {'us/request':>11} {'rewrites cookie':>16}")
+    print(f"{'session':16} {len(session_cookie):>13} {session_us:>11.1f} {str(rewritten is not None):>16}")
+    print(f"{'token':16} {len(token_cookie):>13} {token_us:>11.1f} {str(token_rewritten is not None):>16}")
+    print(f"{'no cookie':16} {0:>13} {bare_us:>11.1f} {'False':>16}")
+    print(f"\nauth overhead over a bare request: session {session_us - bare_us:.1f} us, token {token_us - bare_us:.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,274 @@
+"""Headless games: bots play the real GameRoom logic on a virtual clock.
+
+Each game joins ``--players`` bots into a room on the memory store and goes
+start -> tasks -> sabotage -> kill/report -> meeting -> vote -> results
+through the same ``apply`` events the endpoints use. The room's GameClock
+runs with ``autorun=False`` and is advanced by hand from one event to the
+next, so the meeting countdown and vote timeout take no wall time. Bots read
+the room directly and only open a transaction to act. There are no
+sockets; messages end in the room's resume buffer.
+
+Bots follow a policy (see POLICIES): crewmates finish tasks at a steady
+rate and vote with some clue who the impostor is, impostors kill on a
+timer, sabotage when they can and agree on whom to vote out. Games are
+spread over a process pool; the output is win rates, game length and the
+virtual and CPU time spent in each game state.
+
+    python bench/simulate.py --games 20000 --players 10 --policy sharp
+"""
+import argparse
+import heapq
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import NamedTuple
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+os.environ["EVENT_LOG_DIR"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["STATE_STORE"] = "memory"
+import server  # noqa: E402
+from clock import GameClock  # noqa: E402
+
+ENDED = ("aftergame", "after_game")
+MAX_GAME_TIME = 3 * 60 * 60   # virtual seconds before a game counts as stuck
+
+
+class Policy(NamedTuple):
+    task_time: float        # mean seconds a crewmate needs per task
+    kill_interval: float    # mean seconds between an impostor's kills
+    sabotage: bool          # impostors sabotage whenever it is off cooldown
+    emergency_rate: float   # emergency meetings per player and second
+    think: float            # mean seconds to cast a vote
+    skip: float             # chance a crewmate skips
+    clue: float             # chance a crewmate votes for an impostor
+
+
+POLICIES = {
+    "casual": Policy(task_time=40, kill_interval=90, sabotage=False, emergency_rate=0.0005,
+                     think=40, skip=0.3, clue=0.3),
+    "sharp": Policy(task_time=25, kill_interval=60, sabotage=True, emergency_rate=0.001,
+                    think=20, skip=0.1, clue=0.6),
+    "idle": Policy(task_time=120, kill_interval=45, sabotage=True, emergency_rate=0.0,
+                   think=100, skip=0.5, clue=0.2),
+}
+
+
+class Game:
+    def __init__(self, players: int, policy: Policy, rng: random.Random):
+        self.policy = policy
+        self.rng = rng
+        self.now = 0.0
+        self.events = []
+        self.counter = 0
+        self.ballot_planned = False
+        self.meetings = 0
+        self.ejected = Counter()
+        self.phase_time = defaultdict(float)
+        self.phase_cpu = defaultdict(float)
+
+        self.room = server.create_room()
+        self.room.clock = GameClock(self.room.on_tick, time_fn=lambda: self.now, autorun=False)
+        self.ids = [f"bot{i}" for i in range(players)]
+        with self.room.transaction():
+            for pid in self.ids:
+                self.room.apply("join", player=pid, name=pid)
+        with self.room.transaction():
+            self.room.start()
+            # Clients leave the pregame screen on their own
+            self.room.apply("game_state", state="game")
+
+        self.impostors = [pid for pid in self.ids if self.room.is_impostor(pid)]
+        self.crew = [pid for pid in self.ids if pid not in self.impostors]
+        self.masks = {pid: player.mask for pid, player in self.room.connected_players.items()}
+        self.todo = {pid: rng.sample(list(server.TASKS_BY_ID), len(server.TASKS_BY_ID)) for pid in self.crew}
+        for pid in self.crew:
+            self.later(rng.expovariate(1 / policy.task_time), self.do_task, pid)
+        for pid in self.impostors:
+            self.later(rng.uniform(0.5, 1.5) * policy.kill_interval, self.kill, pid)
+        if policy.sabotage:
+            self.later(rng.uniform(10, 60), self.sabotage, self.impostors[0])
+        if policy.emergency_rate:
+            self.later(rng.expovariate(policy.emergency_rate * players), self.emergency, None)
+
+    def later(self, delay, action, pid):
+        self.counter += 1
+        heapq.heappush(self.events, (self.now + delay, self.counter, action, pid))
+
+    def apply(self, kind, **data):
+        """One event in its own transaction, like an endpoint would do it."""
+        with self.room.transaction():
+            return self.room.apply(kind, **data)
+
+    def alive(self, pids):
+        alive_mask = self.room.alive_mask
+        return [pid for pid in pids if alive_mask & self.masks[pid]]
+
+    # ─────────────────────────────────────────────────────────── bot actions
+    def do_task(self, pid):
+        room = self.room
+        if room.game_state == "game" and not room.sabotage_active and self.todo[pid]:
+            self.apply("task", player=pid, task=self.todo[pid].pop(), done=True)
+        if self.todo[pid]:
+            self.later(self.rng.expovariate(1 / self.policy.task_time), self.do_task, pid)
+
+    def kill(self, pid):
+        room = self.room
+        if not room.alive_mask & self.masks[pid]:
+            return
+        if room.game_state == "game":
+            victims = self.alive(self.crew)
+            if victims:
+                self.apply("report", player=self.rng.choice(victims))
+        self.later(self.rng.uniform(0.5, 1.5) * self.policy.kill_interval, self.kill, pid)
+
+    def sabotage(self, pid):
+        room = self.room
+        if room.game_state == "game" and not room.sabotage_active and not room.clock.pending("sabotage_cooldown"):
+            with room.transaction():
+                room.start_sabotage()
+        self.later(self.rng.uniform(5, 30), self.sabotage, pid)
+
+    def emergency(self, _):
+        room = self.room
+        if room.game_state == "game":
+            self.apply("emergency", caller=self.rng.choice(self.alive(self.ids)))
+        self.later(self.rng.expovariate(self.policy.emergency_rate * len(self.ids)), self.emergency, None)
+
+    def plan_ballot(self):
+        """Voting just opened: every alive player casts a vote after thinking about it."""
+        self.meetings += 1
+        self.ballot_planned = True
+        alive_crew = self.alive(self.crew)
+        self.victim = self.rng.choice(alive_crew) if alive_crew else None
+        # Nobody dies while the vote is open
+        self.voters = self.alive(self.ids)
+        self.suspects = self.alive(self.impostors)
+        for pid in self.voters:
+            self.later(self.rng.expovariate(1 / self.policy.think), self.vote, pid)
+
+    def vote(self, pid):
+        room = self.room
+        if room.game_state != "vote" or not room.clock.pending("vote"):
+            return
+        policy = self.policy
+        if pid in self.impostors:
+            target = self.victim
+        else:
+            roll = self.rng.random()
+            if roll < policy.skip:
+                target = None
+            elif roll < policy.skip + policy.clue and self.suspects:
+                target = self.rng.choice(self.suspects)
+            else:
+                target = self.rng.choice([other for other in self.voters if other != pid])
+        before = room.ghost_mask
+        if self.apply("vote", voter=pid, target=target):
+            self.count_ejection(before)
+
+    def count_ejection(self, before):
+        ejected = self.room.ghost_mask & ~before
+        for pid in self.ids:
+            if ejected & self.masks[pid]:
+                self.ejected["impostor" if pid in self.impostors else "crew"] += 1
+
+    # ─────────────────────────────────────────────────────────── loop
+    def run(self):
+        room = self.room
+        while room.game_state not in ENDED:
+            state = room.game_state
+            started = time.perf_counter()
+            voting = room.clock.pending("vote")
+            ghosts = room.ghost_mask
+            delay = room.clock.advance(self.now)
+            if voting and not room.clock.pending("vote"):
+                # The vote timed out
+                self.count_ejection(ghosts)
+            if room.clock.pending("vote"):
+                if not self.ballot_planned:
+                    self.plan_ballot()
+            else:
+                self.ballot_planned = False
+
+            next_bot = self.events[0][0] if self.events else math.inf
+            next_clock = self.now + delay if delay is not None else math.inf
+            upcoming = min(next_bot, next_clock)
+            if room.game_state in ENDED or upcoming > MAX_GAME_TIME:
+                self.phase_cpu[state] += time.perf_counter() - started
+                break
+            self.phase_time[state] += upcoming - self.now
+            self.now = upcoming
+
+            if next_bot <= upcoming:
+                _, _, action, pid = heapq.heappop(self.events)
+                action(pid)
+            self.phase_cpu[state] += time.perf_counter() - started
+
+        with room.transaction():
+            winner = room.winner() if room.game_state in ENDED else "Stuck"
+            room.close()
+        return winner
+
+
+def play(args):
+    """Play ``count`` games starting at ``seed``; returns summed statistics."""
+    seed, count, players, policy_name = args
+    random.seed(seed)
+    rng = random.Random(seed)
+    stats = {"wins": Counter(), "ejected": Counter(), "meetings": 0, "length": 0.0,
+             "phase_time": Counter(), "phase_cpu": Counter(), "games": count}
+    for _ in range(count):
+        game = Game(players, POLICIES[policy_name], rng)
+        stats["wins"][game.run()] += 1
+        stats["ejected"].update(game.ejected)
+        stats["meetings"] += game.meetings
+        stats["length"] += game.now
+        stats["phase_time"].update(game.phase_time)
+        stats["phase_cpu"].update(game.phase_cpu)
+    return stats
+
+
+def main(args):
+    chunks = [(args.seed + i, min(args.chunk, args.games - start), args.players, args.policy)
+              for i, start in enumerate(range(0, args.games, args.chunk))]
+    total = {"wins": Counter(), "ejected": Counter(), "meetings": 0, "length": 0.0,
+             "phase_time": Counter(), "phase_cpu": Counter(), "games": 0}
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        for stats in pool.imap_unordered(play, chunks):
+            for key, value in stats.items():
+                total[key] += value
+    elapsed = time.perf_counter() - started
+
+    games = total["games"]
+    print(f"{games} games, {args.players} players, policy {args.policy}: "
+          f"{elapsed:.2f}s on {args.workers} workers ({games / elapsed:,.0f} games/s)")
+    for winner, wins in total["wins"].most_common():
+        print(f"  {winner:9} {wins / games:6.1%}")
+    print(f"  game length {total['length'] / games:.0f}s virtual, {total['meetings'] / games:.2f} meetings, "
+          f"ejected per game: {total['ejected']['impostor'] / games:.2f} impostors, "
+          f"{total['ejected']['crew'] / games:.2f} crew")
+    cpu = sum(total["phase_cpu"].values())
+    print(f"  {'state':10} {'virtual s':>10} {'cpu us':>8} {'cpu share':>9}")
+    for state, seconds in total["phase_time"].most_common():
+        print(f"  {state:10} {seconds / games:>10.1f} {total['phase_cpu'][state] / games * 1e6:>8.0f} "
+              f"{total['phase_cpu'][state] / cpu:>9.1%}")
+    print(f"  cpu per game {cpu / games * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--policy", choices=POLICIES, default="casual")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=250, help="games per pool task")
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
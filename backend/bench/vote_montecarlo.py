@@ -0,0 +1,87 @@
+"""Monte Carlo meetings for tuning VOTE_DURATION, the vote rules and calc_num_impostors.
+
+Every simulated meeting has all players alive and the impostor count the
+server would pick. Each voter needs an exponentially distributed time to
+decide (mean ``--think``) and does not vote if that exceeds the vote
+duration. Crewmates skip with ``--skip``, otherwise vote for an impostor
+with ``--clue`` or for a random other player; impostors all pile onto the
+same crewmate. Ballots are resolved with ``voting.resolve_batch``, the rules
+the live endpoint uses through ``voting.resolve``.
+
+    python bench/vote_montecarlo.py --games 200000 --durations 60 120
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+os.environ["EVENT_LOG_DIR"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+import server  # noqa: E402
+import voting  # noqa: E402
+
+RULE_SETS = {
+    "current": server.VOTE_RULES,
+    "partial": server.VOTE_RULES._replace(require_all=False),
+    "plurality": voting.VoteRules(skip_majority=0.5, eject_majority=0.0, require_all=False),
+}
+
+
+def simulate(rng, games, players, duration, args):
+    """Ballots (games x players) of one meeting setup and the number of impostors in it."""
+    impostors = server.calc_num_impostors(players)
+    voter = np.arange(players)
+
+    # Crew: skip, suspect an impostor, or pick anyone but themselves
+    other = rng.integers(0, players - 1, size=(games, players))
+    other += other >= voter
+    suspect = rng.integers(0, impostors, size=(games, players))
+    roll = rng.random((games, players))
+    ballots = np.where(roll < args.skip, voting.SKIP, np.where(roll < args.skip + args.clue, suspect, other))
+
+    # Impostors (indices 0..impostors-1) agree on one crewmate
+    victim = rng.integers(impostors, players, size=(games, 1))
+    ballots[:, :impostors] = victim
+
+    late = rng.exponential(args.think, size=(games, players)) > duration
+    ballots[late] = voting.ABSENT
+    return ballots, impostors
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    print(f"{'players':>7} {'imp':>3} {'duration':>8} {'rules':>9} {'complete':>9} "
+          f"{'ejected':>8} {'impostor':>9} {'crew':>6}")
+    resolved = 0
+    spent = 0.0
+    for players in args.players:
+        for duration in args.durations:
+            ballots, impostors = simulate(rng, args.games, players, duration, args)
+            complete = (ballots != voting.ABSENT).all(axis=1).mean()
+            for name, rules in RULE_SETS.items():
+                started = time.perf_counter()
+                ejected = voting.resolve_batch(ballots, players, rules, num_targets=players)
+                spent += time.perf_counter() - started
+                resolved += args.games
+                out = ejected != voting.NO_EJECTION
+                impostor = (out & (ejected < impostors)).mean()
+                print(f"{players:>7} {impostors:>3} {duration:>8} {name:>9} {complete:>9.1%} "
+                      f"{out.mean():>8.1%} {impostor:>9.1%} {out.mean() - impostor:>6.1%}")
+    print(f"resolved {resolved:,} ballots in {spent:.2f}s ({resolved / spent:,.0f} ballots/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200000, help="meetings per setup")
+    parser.add_argument("--players", type=int, nargs="+", default=[5, 8, 12, 16, 20])
+    parser.add_argument("--durations", type=float, nargs="+", default=[30, 60, 90, server.VOTE_DURATION, 180])
+    parser.add_argument("--think", type=float, default=30, help="mean seconds a player needs to vote")
+    parser.add_argument("--skip", type=float, default=0.2, help="chance a crewmate skips")
+    parser.add_argument("--clue", type=float, default=0.35, help="chance a crewmate votes for an impostor")
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+"""Encode cost and bytes on the wire of /ws messages, JSON vs. msgpack.
+
+Payloads are shaped like the real messages of a full 20-player room.
+``vote_update`` is the old full-vote-map tick, kept for comparison with the
+``vote_cast`` delta that replaced it.
+
+    python bench/wire_formats.py
+"""
+import argparse
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import wire  # noqa: E402
+
+PLAYERS = 20
+ids = [str(uuid.uuid4()) for _ in range(PLAYERS)]
+
+MESSAGES = {
+    "players_update": {
+        "type": "players_update",
+        "players": [
+            {"id": pid, "name": f"Player {i}", "character": f"ch{i + 1}.png", "ghost": i % 5 == 0, "presence": "online"}
+            for i, pid in enumerate(ids)
+        ],
+        "starter_id": ids[0],
+        "version": 42,
+        "seq": 1234,
+    },
+    "vote_update": {
+        "type": "vote_update",
+        "time_left": 87.31234,
+        "votes": {voter: ids[(i * 7) % PLAYERS] if i % 4 else None for i, voter in enumerate(ids)},
+    },
+    "vote_cast": {"type": "vote_cast", "voter": ids[3], "target": ids[8], "seq": 1240},
+    "global_progress": {"type": "global_progress", "progress": 57, "seq": 1241},
+    "results": {
+        "type": "results",
+        "ejected": {"name": "Player 8", "character": "ch9.png", "role": "Crewmate"},
+        "seq": 1242,
+    },
+    "game_end": {"type": "game_end", "winner": "Impostor", "seq": 1243},
+}
+
+
+def main(number):
+    if not wire.msgpack:
+        sys.exit("msgpack is not installed")
+
+    print(f"{'message':18} {'json B':>8} {'msgpack B':>10} {'saved':>7} {'json us':>9} {'msgpack us':>11}")
+    for name, message in MESSAGES.items():
+        sizes = {fmt: len(wire.encode(message, fmt).encode() if fmt == wire.JSON else wire.encode(message, fmt))
+                 for fmt in (wire.JSON, wire.MSGPACK)}
+        costs = {fmt: timeit.timeit(lambda: wire.encode(message, fmt), number=number) / number * 1e6
+                 for fmt in (wire.JSON, wire.MSGPACK)}
+        saved = 1 - sizes[wire.MSGPACK] / sizes[wire.JSON]
+        print(f"{name:18} {sizes[wire.JSON]:>8} {sizes[wire.MSGPACK]:>10} {saved:>7.0%} "
+              f"{costs[wire.JSON]:>9.2f} {costs[wire.MSGPACK]:>11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="encodes per measurement")
+    main(parser.parse_args().number)
@@ -0,0 +1,146 @@
+"""Per-room timer scheduler.
+
+Every deadline of a game (meeting countdown, vote, sabotage) is a named timer
+in one heap on a monotonic clock. Scheduling a name that is already pending
+supersedes the old timer, so overlapping reports or emergencies can never run
+two countdowns side by side. Timers flagged ``tick`` also drive a single
+once-per-second tick stream for the whole room.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+TICK_INTERVAL = 1.0
+
+log = logging.getLogger("amongus.clock")
+
+
+class Timer:
+    __slots__ = ("deadline", "seq", "callback", "tick")
+
+    def __init__(self, deadline, seq, callback, tick):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.tick = tick
+
+
+class GameClock:
+    """Heap of named deadlines plus one tick stream, run by a single task.
+
+    ``on_tick`` receives ``{name: seconds_left}`` for the ticking timers.
+    ``advance(now)`` fires whatever is due and can be driven by hand with a
+    fake ``time_fn``; with ``autorun`` a background task does it on time.
+    """
+
+    def __init__(self, on_tick=None, time_fn=time.monotonic, autorun=True):
+        self.on_tick = on_tick
+        self.time_fn = time_fn
+        self.autorun = autorun
+        self.timers = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.next_tick = None
+        self.runner = None
+        self.wakeup = None
+
+    def now(self):
+        return self.time_fn()
+
+    def schedule(self, name, delay, callback, tick=False):
+        """(Re)arm timer ``name``; a pending timer of the same name is superseded."""
+        now = self.time_fn()
+        timer = Timer(now + delay, next(self.counter), callback, tick)
+        self.timers[name] = timer
+        heapq.heappush(self.heap, (timer.deadline, timer.seq, name))
+        if tick:
+            # Realign the tick stream on the new countdown so it starts on a whole second
+            self.next_tick = now
+        self.wake()
+        return timer.deadline
+
+    def cancel(self, name):
+        # The heap entry goes stale and is skipped when it surfaces
+        self.timers.pop(name, None)
+
+    def cancel_all(self):
+        self.timers.clear()
+        self.heap.clear()
+        self.next_tick = None
+
+    def remaining(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            return None
+        return max(0.0, timer.deadline - self.time_fn())
+
+    def pending(self, name) -> bool:
+        return name in self.timers
+
+    def advance(self, now=None):
+        """Fire due timers and the tick; return seconds until the next event (None if idle)."""
+        if now is None:
+            now = self.time_fn()
+
+        while self.heap and self.heap[0][0] <= now:
+            _, seq, name = heapq.heappop(self.heap)
+            timer = self.timers.get(name)
+            if timer is None or timer.seq != seq:
+                continue
+            del self.timers[name]
+            try:
+                timer.callback()
+            except Exception:
+                log.exception("Timer %s failed", name)
+
+        if self.next_tick is not None and self.next_tick <= now:
+            ticking = {name: timer.deadline - now for name, timer in self.timers.items() if timer.tick}
+            if ticking:
+                if self.on_tick:
+                    self.on_tick(ticking)
+                while self.next_tick <= now:
+                    self.next_tick += TICK_INTERVAL
+            else:
+                self.next_tick = None
+
+        # Drop superseded entries so the next deadline is a live one
+        while self.heap:
+            _, seq, name = self.heap[0]
+            timer = self.timers.get(name)
+            if timer is not None and timer.seq == seq:
+                break
+            heapq.heappop(self.heap)
+
+        upcoming = [t for t in (self.heap[0][0] if self.heap else None, self.next_tick) if t is not None]
+        return max(0.0, min(upcoming) - now) if upcoming else None
+
+    def wake(self):
+        if not self.autorun:
+            return
+        if self.runner is None or self.runner.done():
+            self.wakeup = asyncio.Event()
+            self.runner = asyncio.get_running_loop().create_task(self.run())
+        else:
+            self.wakeup.set()
+
+    async def run(self):
+        while True:
+            delay = self.advance()
+            self.wakeup.clear()
+            if delay is None:
+                await self.wakeup.wait()
+                continue
+            # Not wait_for: on 3.11 it swallows a cancel that lands together with the wakeup
+            try:
+                async with asyncio.timeout(delay):
+                    await self.wakeup.wait()
+            except TimeoutError:
+                pass
+
+    def stop(self):
+        self.cancel_all()
+        if self.runner:
+            self.runner.cancel()
+            self.runner = None
@@ -0,0 +1,93 @@
+"""Append-only per-game event log with compact snapshots.
+
+Each room incarnation writes ``<code>-<uid>.jsonl`` with one line per game
+event (``{"n", "t", "kind", "data"}``, ``n`` counting up from 1) and keeps
+the latest full room state in ``<code>-<uid>.snapshot.json``. Lines are
+buffered and written in batches; the server also flushes all logs on a
+short interval, so at most a fraction of a second of events is in memory.
+
+Restoring a game is: load the snapshot, then replay the events after it.
+Logs of closed rooms are renamed to ``<code>-<uid>.closed.jsonl`` and only
+kept for offline replays.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+FLUSH_BATCH = 64        # buffered lines that force a write
+SNAPSHOT_EVERY = 200    # events between snapshots
+
+
+class EventLog:
+    def __init__(self, directory: Path, code: str, uid: str):
+        self.path = directory / f"{code}-{uid}.jsonl"
+        self.snapshot_path = directory / f"{code}-{uid}.snapshot.json"
+        self.buffer = []
+        self.file = None
+        self.since_snapshot = 0
+
+    def append(self, n: int, kind: str, data: dict):
+        self.buffer.append(json.dumps({"n": n, "t": time.time(), "kind": kind, "data": data}) + "\n")
+        self.since_snapshot += 1
+        if len(self.buffer) >= FLUSH_BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write("".join(self.buffer))
+        self.file.flush()
+        self.buffer.clear()
+
+    def snapshot_due(self) -> bool:
+        return self.since_snapshot >= SNAPSHOT_EVERY
+
+    def snapshot(self, n: int, state: dict):
+        """Write the room state after event ``n``; replaces the previous snapshot atomically."""
+        self.flush()
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"n": n, "state": state}))
+        os.replace(tmp, self.snapshot_path)
+        self.since_snapshot = 0
+
+    def close(self):
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def finish(self):
+        """Close a log whose game is over: renamed to ``*.closed.jsonl`` so it is never restored."""
+        self.close()
+        if self.path.exists():
+            os.replace(self.path, self.path.with_name(self.path.name[:-len(".jsonl")] + ".closed.jsonl"))
+        self.snapshot_path.unlink(missing_ok=True)
+
+
+def read_events(path: Path, after: int = 0):
+    """Events of a log with ``n > after``, in order; a torn last line is ignored."""
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if event["n"] > after:
+                events.append(event)
+    # Workers sharing a room append in commit order, but not necessarily in one write
+    events.sort(key=lambda event: event["n"])
+    return events
+
+
+def read_snapshot(path: Path):
+    """``(n, state)`` of the game's snapshot, ``(0, None)`` when there is none."""
+    snapshot_path = path.with_name(path.name[:-len(".jsonl")] + ".snapshot.json")
+    if not snapshot_path.exists():
+        return 0, None
+    snapshot = json.loads(snapshot_path.read_text())
+    return snapshot["n"], snapshot["state"]
@@ -0,0 +1,161 @@
+"""Structured logging that keeps log I/O off the event loop.
+
+``setup()`` gives the "amongus" logger a queue handler. Logging a record
+does no formatting or I/O on the event loop: the message is pinned and the
+record goes onto a queue. A writer thread takes everything that has piled
+up, formats it as JSON lines and writes it with a single call.
+
+Records carry the ``game`` (``<code>-<uid>``, the same name as the game's
+event log) and ``player`` they belong to. Both are read from context
+variables: requests set the player, room commands set the game. Repeated
+warnings and errors are rate limited per logger, level and message
+template (a mass disconnect logs the same one per socket). After
+RATE_BURST records in RATE_WINDOW seconds the rest are dropped and counted,
+and the first record of the next window reports how many were suppressed.
+Forked children (the bench's worker pool) start a writer thread of their own.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+RATE_WINDOW = 10.0   # seconds
+RATE_BURST = 5       # records per message template and window
+BATCH_SIZE = 256     # records written per call at most
+
+game_id = contextvars.ContextVar("game_id", default=None)
+player_id = contextvars.ContextVar("player_id", default=None)
+
+STOP = object()
+
+
+class Correlation(logging.Filter):
+    def filter(self, record):
+        if getattr(record, "game", None) is None:
+            record.game = game_id.get()
+        if getattr(record, "player", None) is None:
+            record.player = player_id.get()
+        return True
+
+
+class RateLimit(logging.Filter):
+    def __init__(self, window: float = RATE_WINDOW, burst: int = RATE_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        # (logger, level, template) -> [window start, records, suppressed]
+        self.seen = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        entry = self.seen.get(key)
+        if entry is None or now - entry[0] >= self.window:
+            if entry and entry[2]:
+                record.suppressed = entry[2]
+            entry = self.seen[key] = [now, 0, 0]
+        entry[1] += 1
+        if entry[1] > self.burst:
+            entry[2] += 1
+            return False
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    FIELDS = ("game", "player", "event", "n", "data", "handler", "stack", "suppressed")
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Formatting (JSON, tracebacks) happens on the writer thread; only pin the message here
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class Writer(threading.Thread):
+    """Drains the record queue in batches into ``stream``."""
+
+    def __init__(self, records: queue.SimpleQueue, stream, formatter: logging.Formatter):
+        super().__init__(name="log-writer", daemon=True)
+        self.records = records
+        self.stream = stream
+        self.formatter = formatter
+
+    def run(self):
+        while True:
+            batch = [self.records.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [self.formatter.format(record) for record in batch if record is not STOP]
+            if lines:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            if len(lines) < len(batch):
+                return
+
+    def stop(self):
+        """Write out what is queued and end the thread."""
+        self.records.put(STOP)
+        self.join()
+
+
+def setup(level: str = "INFO", stream=None) -> Writer:
+    """Route the "amongus" logger through the queue; returns the started writer thread."""
+    handler = QueueHandler(None)
+    handler.addFilter(RateLimit())
+    handler.addFilter(Correlation())
+
+    logger = logging.getLogger("amongus")
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    return start_writer(handler, stream or sys.stderr)
+
+
+def start_writer(handler: QueueHandler, stream) -> Writer:
+    """Give ``handler`` a fresh queue and a writer thread draining it into ``stream``."""
+    records = queue.SimpleQueue()
+    handler.queue = records
+    handler.writer = writer = Writer(records, stream, JSONFormatter())
+    writer.start()
+    atexit.register(writer.stop)
+    return writer
+
+
+def restart_after_fork():
+    """A forked child inherits the handler but not the writer thread; start one of its own."""
+    for handler in logging.getLogger("amongus").handlers:
+        if isinstance(handler, QueueHandler):
+            start_writer(handler, handler.writer.stream)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=restart_after_fork)
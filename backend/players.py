@@ -0,0 +1,58 @@
+"""Compact per-player records and the bit helpers the room uses with them.
+
+Every player of a room gets a small integer ``index`` when joining. Room-wide
+sets (alive, ghosts, impostors) are ints used as bitmasks over those indices,
+so membership tests and counts are single integer operations. A player's
+tasks are two masks over the task catalog: assigned and done.
+"""
+
+
+def bit(index: int) -> int:
+    return 1 << index
+
+
+def popcount(mask: int) -> int:
+    return mask.bit_count()
+
+
+def lowest_free(mask: int) -> int:
+    """Index of the lowest clear bit of ``mask``."""
+    return (~mask & (mask + 1)).bit_length() - 1
+
+
+class Player:
+    __slots__ = ("index", "id", "name", "role", "character", "tasks", "done", "socket")
+
+    def __init__(self, index: int, player_id: str, name: str):
+        self.index = index
+        self.id = player_id
+        self.name = name
+        self.role = None
+        self.character = None
+        self.tasks = 0      # bitmask of assigned catalog tasks
+        self.done = 0       # bitmask of completed ones, always a subset of ``tasks``
+        self.socket = None  # id of the live /ws connection, None while away
+
+    @property
+    def mask(self) -> int:
+        return 1 << self.index
+
+    def reset(self):
+        self.role = None
+        self.character = None
+        self.tasks = 0
+        self.done = 0
+
+    def to_state(self):
+        return [self.index, self.id, self.name, self.role, self.character, self.tasks, self.done, self.socket]
+
+    @classmethod
+    def from_state(cls, state):
+        index, player_id, name, role, character, tasks, done, socket = state
+        player = cls(index, player_id, name)
+        player.role = role
+        player.character = character
+        player.tasks = tasks
+        player.done = done
+        player.socket = socket
+        return player
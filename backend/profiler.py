@@ -0,0 +1,217 @@
+"""Opt-in event loop profiler: who holds the loop, and for how long.
+
+``start()`` wraps ``asyncio.Handle._run``, the one place every callback and
+task step of the loop goes through, with two clock reads. The time is
+billed to the ``Span`` in the callback's context: HTTP requests get one from
+``Middleware``, long-lived tasks (sockets, room actors, background loops)
+name themselves with ``label()``. Room commands run on the actor for their
+caller, so the actor hands their time back with ``charge()``.
+
+A sampler thread looks at the loop thread ``hz`` times a second. While a
+callback is running it records the folded stack into a ring of the last
+``window`` seconds; ``dump()`` turns part of it into the folded format of
+flamegraph.pl and speedscope. An idle loop is not sampled. A callback
+still running after ``threshold`` seconds has its stack kept, and when it
+returns it is logged with that stack as a slow callback.
+
+The cost while on is the wrapper (about a microsecond per callback) and the
+sampler; at the default 20 Hz it can stay on in production. Only the pure
+Python event loop can be wrapped, not uvloop.
+"""
+import asyncio
+import collections
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger("amongus.profiler")
+
+SPAN = contextvars.ContextVar("profile_span", default=None)
+
+active = None
+
+
+class Span:
+    """Loop time of one handler. ``name`` may be filled in later (HTTP routes are known after routing)."""
+    __slots__ = ("name", "busy")
+
+    def __init__(self, name=None):
+        self.name = name
+        self.busy = 0.0
+
+
+def label(name):
+    """Bill the loop time of the current task (and tasks it starts) to ``name``; returns the span."""
+    span = Span(name)
+    SPAN.set(span)
+    return span
+
+
+def charge(context, seconds):
+    """Bill ``seconds`` of the running callback to the span of ``context`` instead of its own."""
+    if active is not None:
+        span = context.get(SPAN)
+        active.charged += seconds
+        active.bill(span, seconds)
+        if seconds >= active.threshold:
+            active.blame = span
+
+
+def describe(handle) -> str:
+    """Coroutine behind a task step, the callback otherwise."""
+    task = getattr(handle._callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        return f"{task.get_name()} {task.get_coro().__qualname__}"
+    return repr(handle._callback)
+
+
+def frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class Profiler:
+    def __init__(self, busy, slow, threshold=0.1, hz=20, window=300):
+        self.busy = busy            # metrics.Counter by handler
+        self.slow = slow            # metrics.Counter by handler
+        self.threshold = threshold
+        self.interval = 1 / hz
+        self.samples = collections.deque(maxlen=int(hz * window))
+        self.current = None         # (started, handle) of the running callback
+        self.charged = 0.0
+        self.blame = None           # span charged a slow command within the running callback
+        self.stuck = None           # the ``current`` that passed the threshold
+        self.stuck_stack = None
+        self.thread = None
+        self.original = None
+        self.sampler = None
+        self.stopping = threading.Event()
+
+    def bill(self, span, seconds):
+        if span is None:
+            self.busy.inc("other", amount=seconds)
+            return
+        span.busy += seconds
+        if span.name:
+            self.busy.inc(span.name, amount=seconds)
+
+    def running(self) -> float:
+        """Loop time of the callback running now, not yet billed."""
+        current = self.current
+        return time.perf_counter() - current[0] - self.charged if current else 0.0
+
+    def install(self):
+        """Wrap the handles of the running loop and start sampling it."""
+        loop = asyncio.get_running_loop()
+        if not isinstance(loop, asyncio.BaseEventLoop):
+            raise RuntimeError(f"Cannot profile {type(loop).__name__}, run with the asyncio loop")
+        self.thread = threading.get_ident()
+        self.original = original = asyncio.Handle._run
+        clock = time.perf_counter
+        profiler = self
+
+        def run(handle):
+            profiler.charged = 0.0
+            profiler.blame = None
+            started = clock()
+            profiler.current = current = (started, handle)
+            try:
+                original(handle)
+            finally:
+                profiler.current = None
+                elapsed = clock() - started
+                profiler.bill(handle._context.get(SPAN), elapsed - profiler.charged)
+                if elapsed >= profiler.threshold:
+                    profiler.report(current, elapsed)
+
+        asyncio.Handle._run = run
+        self.sampler = threading.Thread(target=self.sample, name="loop-sampler", daemon=True)
+        self.sampler.start()
+
+    def uninstall(self):
+        if self.original:
+            asyncio.Handle._run = self.original
+            self.original = None
+        self.stopping.set()
+        if self.sampler:
+            self.sampler.join()
+
+    # ─────────────────────────────────────────────────────────── sampler thread
+    def sample(self):
+        while not self.stopping.wait(self.interval):
+            current = self.current
+            if current is None:
+                continue
+            frame = sys._current_frames().get(self.thread)
+            if frame is None or self.current is not current:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            now = time.perf_counter()
+            self.samples.append((now, ";".join(frame_name(f.f_code) for f in reversed(frames))))
+            if now - current[0] >= self.threshold and self.stuck is not current:
+                self.stuck_stack = [f"{f.f_code.co_filename}:{f.f_lineno} {frame_name(f.f_code)}" for f in frames]
+                self.stuck = current
+
+    def report(self, current, elapsed):
+        span = self.blame or current[1]._context.get(SPAN)
+        handler = (span and span.name) or "other"
+        stack = self.stuck_stack if self.stuck is current else None
+        self.slow.inc(handler)
+        log.warning("Slow callback held the loop for %.0fms: %s", elapsed * 1000, describe(current[1]),
+                    extra={"handler": handler, "stack": stack})
+
+    def dump(self, seconds: float) -> str:
+        """Folded stacks (``frame;frame;frame count`` per line) sampled in the last ``seconds``."""
+        since = time.perf_counter() - seconds
+        counts = collections.Counter(stack for at, stack in list(self.samples) if at >= since)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def start(busy, slow, threshold=0.1, hz=20, window=300) -> Profiler:
+    """Profile the running loop; see ``Profiler`` for the arguments."""
+    global active
+    profiler = Profiler(busy, slow, threshold, hz, window)
+    profiler.install()
+    active = profiler
+    return profiler
+
+
+def stop():
+    global active
+    if active is not None:
+        active.uninstall()
+        active = None
+
+
+class Middleware:
+    """ASGI middleware giving every HTTP request a span; records its busy and await time per route."""
+
+    def __init__(self, app, histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if active is None or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        span = label(None)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            wall = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            busy = span.busy
+            if active is not None:
+                active.busy.inc(route, amount=busy)
+                # This step is billed when it returns, under the name set below
+                busy += active.running()
+            # Tasks the request started keep billing the span, now under its route
+            span.name = route
+            self.histogram.observe(busy, route, "busy")
+            self.histogram.observe(max(0.0, wall - busy), route, "await")
@@ -1,9 +1,16 @@
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
-from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import HTTPException
+from contextlib import asynccontextmanager, contextmanager
 import asyncio
+import contextvars
+import logging
+from collections import deque
+import math
+from pathlib import Path
+import os
 import uuid
 import random
 import time
@@ -11,10 +18,103 @@ from typing import Dict
 import json
 import uvicorn
 
-app = FastAPI()
+from assets import IMMUTABLE, AssetCatalog, etag_matches
+from clock import GameClock
+from eventlog import EventLog, read_events, read_snapshot
+from players import Player, bit, lowest_free, popcount
+from store import RoomNotFound, create_backend
+from tokens import TokenSigner
+import logs
+import metrics
+import profiler
+import voting
+import wire
+
+# "memory" for a single worker, "sqlite" to share rooms between workers
+STATE_STORE = os.environ.get("STATE_STORE", "memory")
+STATE_DB = os.environ.get("STATE_DB", str(Path(__file__).with_name("game_state.db")))
+WORKERS = int(os.environ.get("WORKERS", "6"))
+# Shared by all workers so any of them can verify a player token
+TOKEN_SECRET = os.environ.get("TOKEN_SECRET", "super-secret-key")
+TOKEN_COOKIE = "player"
+TOKEN_TTL = 12 * 60 * 60
+# Per-game event logs; "" turns logging (and restoring games after a restart) off
+EVENT_LOG_DIR = os.environ.get("EVENT_LOG_DIR", str(Path(__file__).with_name("game_logs")))
+LOG_FLUSH_INTERVAL = 0.5
+# Seconds a room may have nobody online before it is closed and its log finished
+ROOM_IDLE_TIMEOUT = float(os.environ.get("ROOM_IDLE_TIMEOUT", "900"))
+REAP_INTERVAL = 60      # seconds between idle room sweeps
+# GET /metrics answers loopback clients only, unless this is set
+METRICS_PUBLIC = os.environ.get("METRICS_PUBLIC") == "1"
+LAG_INTERVAL = 0.5      # seconds between event loop lag probes
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+SECRET_EVENT_FIELDS = ("assignment", "role")    # event data kept out of the logs (who the impostors are)
+# Frontend assets (and the task catalog) served from /api/assets with content-hashed URLs
+ASSET_DIR = Path(os.environ.get("ASSET_DIR", Path(__file__).resolve().parent.parent / "frontend" / "src" / "assets"))
+# Needed by every client once the game starts; the lobby fetches them ahead (characters by player count)
+PRELOAD_ASSETS = ("map.png", "map_full.png", "emg.png", "report.png", "sabotage.png")
+# Event loop profiler (see profiler.py); GET /debug/profile is local only like /metrics
+PROFILE = os.environ.get("PROFILE") == "1"
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "100"))
+PROFILE_HZ = float(os.environ.get("PROFILE_HZ", "20"))
+PROFILE_WINDOW = 300    # seconds of samples kept for /debug/profile
+
+log = logging.getLogger("amongus")
+logs.setup(LOG_LEVEL)
+
+store, channel = create_backend(STATE_STORE, STATE_DB)
+signer = TokenSigner(TOKEN_SECRET, TOKEN_TTL)
+
+# Hot-path metrics; gauges of current state are collected when /metrics is scraped
+HTTP_LATENCY = metrics.Histogram(
+    "amongus_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+FANOUT_SECONDS = metrics.Histogram(
+    "amongus_broadcast_fanout_seconds", "Time to encode and queue one broadcast for the sockets of this worker")
+FRAMES_QUEUED = metrics.Counter("amongus_frames_queued_total", "Frames queued to sockets")
+SOCKET_DROPS = metrics.Counter("amongus_socket_drops_total", "Sockets dropped by the server", ("reason",))
+LOOP_LAG = metrics.Histogram(
+    "amongus_event_loop_lag_seconds", "How late a periodic event loop wakeup ran",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+PHASE_SECONDS = metrics.Histogram(
+    "amongus_phase_duration_seconds", "Length of emergency countdowns, votes and sabotages",
+    ("phase",), metrics.PHASE_BUCKETS)
+GAMES_STARTED = metrics.Counter("amongus_games_started_total", "Games started")
+GAMES_WON = metrics.Counter("amongus_games_won_total", "Finished games by winner", ("winner",))
+# Filled only with PROFILE=1
+LOOP_BUSY = metrics.Counter(
+    "amongus_loop_busy_seconds_total", "Time callbacks held the event loop, by handler", ("handler",))
+SLOW_CALLBACKS = metrics.Counter(
+    "amongus_slow_callbacks_total", "Callbacks that held the event loop longer than PROFILE_SLOW_MS", ("handler",))
+HANDLER_SECONDS = metrics.Histogram(
+    "amongus_handler_seconds", "HTTP request time spent on the event loop (busy) and awaiting (await)",
+    ("route", "part"))
+
+@asynccontextmanager
+async def lifespan(app):
+    if PROFILE:
+        try:
+            profiler.start(LOOP_BUSY, SLOW_CALLBACKS, PROFILE_SLOW_MS / 1000, PROFILE_HZ, PROFILE_WINDOW)
+        except RuntimeError as e:
+            log.warning("Profiler not started: %s", e)
+    restore_games()
+    await channel.start()
+    background = [
+        asyncio.create_task(flush_logs()), asyncio.create_task(watch_loop_lag()),
+        asyncio.create_task(reap_idle_rooms()),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    for room in rooms.values():
+        if room.log:
+            room.log.close()
+    await channel.stop()
+    profiler.stop()
 
-# Session middleware
-app.add_middleware(SessionMiddleware, secret_key="super-secret-key")
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(metrics.LatencyMiddleware, histogram=HTTP_LATENCY)
+app.add_middleware(profiler.Middleware, histogram=HANDLER_SECONDS)
 
 # CORS configuration
 app.add_middleware(
@@ -25,333 +125,1577 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-with open("../frontend/src/assets/tasks.json", "r") as f:
-    ALL_TASKS = json.load(f)
-    f.close()
-
-# Game state
-connected_players: Dict[str, Dict] = {}
-alive_players = None
-player_roles = None
-votes = {}
-players_tasks = {}
-ghost_players = []
-sabotage_timers = {}
-impostor_cooldowns = {}
-active_sabotage = {"active": False, "start_time": None}
-game_state = "welcome"
-vote_start_time = None
+ASSETS = AssetCatalog(ASSET_DIR, "/api/assets/", preload=PRELOAD_ASSETS)
+ALL_TASKS = json.loads(ASSETS.read("tasks.json"))
+
+def index_tasks(tasks):
+    """Task catalog keyed by ``str(id)``, skipping malformed entries."""
+    catalog = {}
+    for task in tasks:
+        if not isinstance(task, dict):
+            log.warning("Task is not a dict: %r", task)
+            continue
+        if "id" not in task:
+            log.warning("Task has no 'id': %r", task)
+            continue
+        catalog[str(task["id"])] = task
+    return catalog
+
+TASKS_BY_ID = index_tasks(ALL_TASKS)
+# Bit of each catalog task in the per-player task masks, in catalog order
+TASK_BITS = {task_id: bit(i) for i, task_id in enumerate(TASKS_BY_ID)}
+ALL_TASKS_MASK = bit(len(TASK_BITS)) - 1
+
 MAX_PLAYERS = 20
-TOTAL_TASKS = len(ALL_TASKS)
+TOTAL_TASKS = len(TASKS_BY_ID)
 SABOTAGE_DURATION = 60
 SABOTAGE_COOLDOWN = 300
 VOTE_DURATION = 120
+VOTE_RULES = voting.RULES
+MEETING_COUNTDOWN = 10
+ROOM_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+ROOM_CODE_LENGTH = 4
+
+OUTBOX_SIZE = 32        # frames queued per socket before it counts as a slow consumer
+SEND_TIMEOUT = 5        # seconds a single send may take before the socket is dropped
+RESUME_BUFFER = 256     # sequenced events kept per room for reconnecting clients
+HEARTBEAT_TIMEOUT = 30  # seconds of /ws silence before a socket is reaped; clients ping every 10
+SPECTATOR_FPS = float(os.environ.get("SPECTATOR_FPS", "4"))   # spectator frames per second
+MAX_SPECTATORS = 500    # per room and worker
+
+class Connection:
+    """One player socket with its own bounded outbound queue.
+
+    A writer task drains the queue so a slow phone only ever delays itself.
+    Frames pushed with a coalesce key replace an older queued frame with the
+    same key (e.g. countdown ticks) instead of piling up behind it.
+    """
+
+    def __init__(self, manager, player_id: str, websocket: WebSocket, fmt: str = wire.JSON):
+        self.manager = manager
+        self.player_id = player_id
+        self.websocket = websocket
+        self.format = fmt
+        self.pending = deque()
+        self.wakeup = asyncio.Event()
+        self.writer = asyncio.create_task(self.run())
+
+    def push(self, frame, key=None) -> bool:
+        if key is not None:
+            for i, (queued_key, _) in enumerate(self.pending):
+                if queued_key == key:
+                    self.pending[i] = (key, frame)
+                    return True
+        if len(self.pending) >= OUTBOX_SIZE:
+            return False
+        self.pending.append((key, frame))
+        self.wakeup.set()
+        return True
+
+    async def run(self):
+        try:
+            while True:
+                if not self.pending:
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                _, frame = self.pending.popleft()
+                if isinstance(frame, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(frame), SEND_TIMEOUT)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(frame), SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log.warning("Dropping connection: %r", e, extra={"player": self.player_id})
+            SOCKET_DROPS.inc("send_failed")
+            self.manager.drop(self.player_id, self)
+
+    async def close(self):
+        self.writer.cancel()
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-
-    async def connect(self, player_id: str, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections[player_id] = websocket
+        self.active_connections: Dict[str, Connection] = {}
+
+    def connect(self, player_id: str, websocket: WebSocket, fmt: str = wire.JSON):
+        old = self.active_connections.get(player_id)
+        if old:
+            if old.websocket is websocket:
+                return
+            old.writer.cancel()
+        self.active_connections[player_id] = Connection(self, player_id, websocket, fmt)
+
+    def disconnect(self, player_id: str, websocket: WebSocket = None):
+        conn = self.active_connections.get(player_id)
+        # Only clear if no new connection was established in the meantime
+        if conn and (websocket is None or conn.websocket is websocket):
+            del self.active_connections[player_id]
+            conn.writer.cancel()
 
-    def disconnect(self, player_id: str):
-        if player_id in self.active_connections:
+    def drop(self, player_id: str, conn: Connection):
+        """Forget a dead or slow socket and close it in the background."""
+        if self.active_connections.get(player_id) is conn:
             del self.active_connections[player_id]
+        asyncio.create_task(conn.close())
+
+    def close(self, player_id: str):
+        conn = self.active_connections.pop(player_id, None)
+        if conn:
+            asyncio.create_task(conn.close())
+
+    def close_all(self):
+        for player_id in list(self.active_connections):
+            self.close(player_id)
+
+    def is_connected(self, player_id: str) -> bool:
+        return player_id in self.active_connections
+
+    def send_personal_message(self, message: dict, player_id: str, cache_key: str = None):
+        conn = self.active_connections.get(player_id)
+        if conn is None:
+            return
+        FRAMES_QUEUED.inc()
+        if not conn.push(wire.frame(message, conn.format, cache_key)):
+            SOCKET_DROPS.inc("queue_full")
+            self.drop(player_id, conn)
+
+    def broadcast(self, message: dict, exclude: str = None, coalesce: bool = False, cache_key: str = None):
+        """Queue one serialized frame per wire format for every socket without awaiting any of them.
+
+        With ``coalesce`` a still-queued frame of the same type is replaced, so
+        clients that fall behind get the latest tick instead of a backlog.
+        ``cache_key`` memoizes the frames across calls (see ``wire.frame``).
+        """
+        if not self.active_connections:
+            return
+        started = time.perf_counter()
+        frames = {}
+        key = message["type"] if coalesce else None
+        queued = 0
+        for pid, conn in list(self.active_connections.items()):
+            if pid == exclude:
+                continue
+            frame = frames.get(conn.format)
+            if frame is None:
+                frame = frames[conn.format] = wire.frame(message, conn.format, cache_key)
+            if conn.push(frame, key):
+                queued += 1
+            else:
+                SOCKET_DROPS.inc("queue_full")
+                self.drop(pid, conn)
+        FRAMES_QUEUED.inc(amount=queued)
+        FANOUT_SECONDS.observe(time.perf_counter() - started)
+
+def replayed(message: dict) -> dict:
+    """A buffered message as it reads now: a resumed vote counts down from where it is."""
+    if message["type"] == "vote_started":
+        return {**message, "time_left": max(0.0, message["deadline"] - time.time())}
+    return message
+
+class SpectatorHub:
+    """Read-only viewers of one room (the TV, a ghost's second screen), apart from the players.
+
+    Spectators are not players: they don't count against MAX_PLAYERS and get
+    no roles, tasks or player ids. Broadcasts of the room are offered to the
+    hub as they are delivered, which only files them: roster, progress,
+    countdown, sabotage and game state keep their latest version, discrete
+    events (flash, report, vote start and casts, results, game end) queue up.
+    A ticker sends what piled up SPECTATOR_FPS times a second as one
+    ``spectator_frame``, encoded once per wire format, so a viewer costs one
+    queue append per frame and nothing on the commands of the game.
+    """
+
+    LATEST = {
+        "players_update": "roster", "global_progress": "progress", "emergency_countdown": "countdown",
+        "sabotage_active": "sabotage", "sabotage_ended": "sabotage", "sabotage_ready": "sabotage",
+        "game_state": "game_state",
+    }
+    EVENTS = {"emergency_flash", "report", "vote_started", "vote_cast", "results", "game_end"}
+
+    def __init__(self, room):
+        self.room = room
+        self.viewers: Dict[str, Connection] = {}
+        # Filing key -> message, in the order they are sent
+        self.pending = {}
+        self.counter = 0
+        self.ticker = None
+
+    def offer(self, message: dict):
+        kind = message["type"]
+        if kind in self.EVENTS:
+            self.counter += 1
+            key = self.counter
+        elif kind in self.LATEST:
+            key = self.LATEST[kind]
+            # The latest version goes out in its own place, after what came before it
+            self.pending.pop(key, None)
+        else:
+            return
+        self.pending[key] = message
+
+    def view(self, message: dict) -> dict:
+        """What spectators see of a message; player ids stay with the players."""
+        kind = message["type"]
+        if kind == "players_update":
+            return {
+                "type": kind, "players": [{k: v for k, v in p.items() if k != "id"} for p in message["players"]],
+                "version": message["version"],
+            }
+        if kind == "vote_cast":
+            voter = self.room.connected_players.get(message["voter"])
+            return {"type": kind, "voter": voter.name if voter else None}
+        return message
+
+    def flush(self):
+        if not self.pending:
+            return
+        message = {"type": "spectator_frame", "events": [self.view(m) for m in self.pending.values()]}
+        self.pending.clear()
+        frames = {}
+        queued = 0
+        for viewer_id, conn in list(self.viewers.items()):
+            frame = frames.get(conn.format)
+            if frame is None:
+                frame = frames[conn.format] = wire.encode(message, conn.format)
+            if conn.push(frame):
+                queued += 1
+            else:
+                SOCKET_DROPS.inc("queue_full")
+                self.drop(viewer_id, conn)
+        FRAMES_QUEUED.inc(amount=queued)
+
+    async def run(self):
+        profiler.label("spectators")
+        while self.viewers:
+            await asyncio.sleep(1 / SPECTATOR_FPS)
+            self.flush()
+        self.pending.clear()
+
+    def add(self, websocket: WebSocket, fmt: str, snapshot: dict):
+        """Start streaming to ``websocket`` after ``snapshot``; returns the viewer id, None when full."""
+        if len(self.viewers) >= MAX_SPECTATORS:
+            return None
+        # What is pending is older than the snapshot; the others get it now, the new viewer never
+        self.flush()
+        viewer_id = uuid.uuid4().hex
+        conn = self.viewers[viewer_id] = Connection(self, viewer_id, websocket, fmt)
+        conn.push(wire.encode(snapshot, fmt))
+        if self.ticker is None or self.ticker.done():
+            self.ticker = asyncio.create_task(self.run())
+        return viewer_id
+
+    def send(self, viewer_id: str, message: dict, cache_key: str = None):
+        conn = self.viewers.get(viewer_id)
+        if conn and not conn.push(wire.frame(message, conn.format, cache_key)):
+            SOCKET_DROPS.inc("queue_full")
+            self.drop(viewer_id, conn)
+
+    def remove(self, viewer_id: str):
+        conn = self.viewers.pop(viewer_id, None)
+        if conn:
+            conn.writer.cancel()
+
+    def drop(self, viewer_id: str, conn: Connection):
+        if self.viewers.get(viewer_id) is conn:
+            del self.viewers[viewer_id]
+        asyncio.create_task(conn.close())
+
+    def close_all(self):
+        for viewer_id, conn in list(self.viewers.items()):
+            self.drop(viewer_id, conn)
+
+class GameRoom:
+    """All state of one lobby/game, keyed by its room code in ``rooms``.
+
+    Only the fields listed in ``STATE_FIELDS`` are game state; they are what
+    the state store persists and shares between workers. Mutations happen
+    inside ``transaction()``, and outgoing messages are buffered in an outbox
+    that is published on the channel once the transaction has committed.
+    Endpoints and timers don't open transactions themselves: they hand
+    commands to the room's actor (``call``/``post``), which runs them one at
+    a time.
+    """
+
+    STATE_FIELDS = (
+        "uid", "member_mask", "alive_mask", "ghost_mask", "impostor_mask", "votes",
+        "sabotage_active", "sabotage_ends_at", "game_state", "vote_start_time",
+        "crew_done", "crew_total", "progress", "roster_version", "seq", "events",
+    )
+
+    def __init__(self, code: str):
+        self.code = code
+        # Codes get reused once a room is gone; the uid tells the incarnations apart
+        self.uid = uuid.uuid4().hex
+        self.connected_players: Dict[str, Player] = {}
+        # Bitmasks over Player.index
+        self.member_mask = 0
+        self.alive_mask = 0
+        self.ghost_mask = 0
+        self.impostor_mask = 0
+        self.votes = {}
+        self.sabotage_active = False
+        self.sabotage_ends_at = None
+        self.game_state = "lobby"
+        self.vote_start_time = None
+        # Running crew task counters so progress never needs a full rescan
+        self.crew_done = 0
+        self.crew_total = 0
+        self.progress = 0
+        # Bumped on every roster change (join, leave, ghost, new game)
+        self.roster_version = 0
+        # Sequence number of the last event sent from a committed write
+        self.seq = 0
+        # Number of the last game event applied (see apply)
+        self.events = 0
+
+        # Per-worker runtime state, never persisted
+        self.version = -1
+        self.outbox = []
+        self.manager = ConnectionManager()
+        self.spectators = SpectatorHub(self)
+        # Task lists joined with the catalog and their pre-serialized GET /api/tasks
+        # bodies, dropped when a player's tasks change
+        self.task_views: Dict[str, list] = {}
+        self.task_responses: Dict[str, bytes] = {}
+        # Presence is not logged, so a restored roster_version can repeat a number clients have
+        # cached; restore_games starts a new epoch and the ETag carries it
+        self.roster_epoch = "0"
+        # (roster_version, players, GET /api/players body) of the last rendered roster
+        self.roster_cache = None
+        # Last RESUME_BUFFER sequenced envelopes, as delivered to this worker
+        self.history = deque(maxlen=RESUME_BUFFER)
+        # Owns every deadline of this room; timers fire in the worker that set them
+        self.clock = GameClock(self.on_tick)
+        # Game events of the running transaction, appended to the log once it commits
+        self.logged = []
+        self.log = None
+        self.replaying = False
+        self.closed = False
+        # Commands waiting for the room's actor, see call()
+        self.mailbox = deque()
+        self.actor = None
+        # Monotonic start of the running emergency/vote/sabotage phase, for PHASE_SECONDS
+        self.phase_started = {}
+        # Monotonic time since which nobody has been online, None while someone is
+        self.idle_since = time.monotonic()
+
+    def to_state(self):
+        state = {field: getattr(self, field) for field in self.STATE_FIELDS}
+        state["players"] = [p.to_state() for p in self.connected_players.values()]
+        return state
+
+    def load_state(self, state):
+        for field in self.STATE_FIELDS:
+            setattr(self, field, state[field])
+        self.connected_players = {}
+        for player_state in state["players"]:
+            player = Player.from_state(player_state)
+            self.connected_players[player.id] = player
+        self.task_views.clear()
+        self.task_responses.clear()
+
+    @contextmanager
+    def transaction(self, write=True):
+        """Refresh the room from the store, run the body, then save and publish.
+
+        Use ``write=False`` for read-only access. The body must not await.
+        """
+        try:
+            with store.transaction(self.code) as record:
+                if record.state is not None and record.version != self.version:
+                    self.load_state(record.state)
+                self.version = record.version
+                rooms.setdefault(self.code, self)
+                game_state = self.game_state
+                yield self
+                if write:
+                    if self.game_state != game_state:
+                        # Players learn about state changes from their own messages, spectators from this
+                        self.outbox.append({"room": self.code, "watch": {"type": "game_state", "state": self.game_state}})
+                    self.stamp_outbox()
+                    record.save(self.to_state() if store.keeps_state else None)
+                    self.version = record.version
+        except BaseException:
+            self.outbox.clear()
+            self.logged.clear()
+            # Local mutations were rolled back in the store; reload next time
+            self.version = -1
+            raise
+
+        self.write_log()
+        outbox, self.outbox = self.outbox, []
+        for envelope in outbox:
+            channel.publish(envelope)
+
+    @property
+    def game_id(self):
+        """Correlation id of this room incarnation in logs, also the name of its event log."""
+        return f"{self.code}-{self.uid}"
+
+    # ─────────────────────────────────────────────────────────── actor
+    async def call(self, command, write=True):
+        """Run ``command(room)`` in a transaction on the room's actor and return its result.
+
+        Commands of one room run one after another in arrival order, so a
+        handler never sees another one half done; other rooms are not held up.
+        Exceptions (HTTPException, RoomNotFound) are raised to the caller.
+        """
+        future = asyncio.get_running_loop().create_future()
+        # The command runs in the caller's context, so its logs name the caller's player
+        self.mailbox.append((command, write, future, contextvars.copy_context()))
+        self.wake_actor()
+        return await future
+
+    def post(self, command, write=True):
+        """``call`` without waiting for the result, for timers.
+
+        Bench tools that drive the clock by hand have no event loop; their
+        commands run right away.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.execute(command, write)
+            return
+        context = contextvars.copy_context()
+        if profiler.active:
+            context.run(profiler.label, "room timer")
+        self.mailbox.append((command, write, None, context))
+        self.wake_actor()
+
+    def wake_actor(self):
+        if self.actor is None or self.actor.done():
+            self.actor = asyncio.get_running_loop().create_task(self.run_actor())
+
+    async def run_actor(self):
+        """Drain the mailbox, yielding to other tasks between commands; exits when it is empty."""
+        profiler.label("room actor")
+        while self.mailbox:
+            command, write, future, context = self.mailbox.popleft()
+            started = time.perf_counter()
+            if future is None:
+                context.run(self.execute, command, write)
+            elif not future.done():
+                try:
+                    future.set_result(context.run(self.execute, command, write, True))
+                except Exception as e:
+                    future.set_exception(e)
+            # The profiler bills the command to whoever sent it, not to the actor
+            profiler.charge(context, time.perf_counter() - started)
+            await asyncio.sleep(0)
+
+    def execute(self, command, write=True, reraise=False):
+        logs.game_id.set(self.game_id)
+        try:
+            with self.transaction(write=write):
+                return command(self)
+        except RoomNotFound:
+            self.clock.stop()
+            if reraise:
+                raise
+        except Exception:
+            if reraise:
+                raise
+            log.exception("Command failed")
+
+    # ─────────────────────────────────────────────────────────── event log
+    def apply(self, kind, **data):
+        """Run game event ``kind`` through its ``on_<kind>`` handler and queue it for the log.
+
+        Every change of game state goes through here, so replaying a log
+        rebuilds the game. Anything random or time-dependent is decided by
+        the caller and passed in ``data``. Presence is not an event.
+        """
+        self.events += 1
+        self.logged.append((self.events, kind, data))
+        return getattr(self, f"on_{kind}")(**data)
+
+    def write_log(self):
+        logged, self.logged = self.logged, []
+        if self.replaying:
+            return
+        # Only committed events are logged, each with its game and player, and only at DEBUG:
+        # one record per event is too much for the hot path, and roles are never written out
+        if log.isEnabledFor(logging.DEBUG):
+            for n, kind, data in logged:
+                data = {k: "redacted" if k in SECRET_EVENT_FIELDS else v for k, v in data.items()}
+                log.debug("Game event %s", kind, extra={
+                    "game": self.game_id, "player": data.get("player"), "event": kind, "n": n, "data": data,
+                })
+        if not EVENT_LOG_DIR:
+            return
+        if logged:
+            if self.log is None:
+                self.log = EventLog(Path(EVENT_LOG_DIR), self.code, self.uid)
+            for n, kind, data in logged:
+                self.log.append(n, kind, data)
+            if not self.closed and self.log.snapshot_due():
+                self.log.snapshot(self.events, self.to_state())
+        if self.closed and self.log:
+            # A finished log is kept for replaying but never restored
+            self.log.finish()
+            self.log = None
+
+    def rearm(self):
+        """Recreate the timers of a restored game from its persisted deadlines."""
+        now = time.time()
+        if self.sabotage_active:
+            self.clock.schedule("sabotage", max(0, self.sabotage_ends_at - now), self.timer(self.end_sabotage))
+        cooldown_ends_at = self.sabotage_state()["cooldownEndsAt"]
+        if cooldown_ends_at and cooldown_ends_at > now:
+            self.clock.schedule("sabotage_cooldown", cooldown_ends_at - now, self.timer(self.sabotage_ready))
+        if self.voting_open() and self.vote_deadline() > now:
+            self.clock.schedule("vote", self.vote_deadline() - now, self.timer(self.vote_timeout, self.vote_start_time))
+        elif self.game_state in ("emergency", "vote"):
+            # The countdown to the vote (or the vote itself) ran out while down: meet again
+            self.begin_meeting()
+
+    def stamp_outbox(self):
+        """Number the events of a write so reconnecting clients can resume after them.
+
+        Read-only transactions only send replies and countdown ticks, which
+        are not worth replaying and stay unsequenced.
+        """
+        for envelope in self.outbox:
+            if "message" in envelope:
+                self.seq += 1
+                envelope["seq"] = self.seq
+                envelope["message"] = {**envelope["message"], "seq": self.seq}
+                # The seq makes the payload unique, nothing left to share
+                envelope.pop("cache_key", None)
+
+    def missed_events(self, player_id, last_seq):
+        """Messages for ``player_id`` after ``last_seq``, or None when the buffer can't cover the gap."""
+        if last_seq > self.seq:
+            return None
+        if last_seq < self.seq and (not self.history or self.history[0]["seq"] > last_seq + 1):
+            return None
+        return [
+            replayed(envelope["message"]) for envelope in self.history
+            if envelope["seq"] > last_seq
+            and (envelope.get("to") == player_id or (not envelope.get("to") and envelope.get("exclude") != player_id))
+        ]
+
+    def resume(self, player_id, last_seq) -> bool:
+        """Replay what the player missed in one frame; False if they need a snapshot."""
+        events = self.missed_events(player_id, last_seq)
+        if events is None:
+            return False
+        self.send_to(player_id, {"type": "resume", "events": events})
+        return True
+
+    def broadcast(self, message: dict, exclude: str = None, coalesce: bool = False, cache_key: str = None):
+        envelope = {"room": self.code, "message": message, "exclude": exclude, "coalesce": coalesce}
+        if cache_key:
+            envelope["cache_key"] = cache_key
+        self.outbox.append(envelope)
+
+    def send_to(self, player_id: str, message: dict, cache_key: str = None):
+        envelope = {"room": self.code, "message": message, "to": player_id}
+        if cache_key:
+            envelope["cache_key"] = cache_key
+        self.outbox.append(envelope)
+
+    @property
+    def leader_id(self):
+        return next(iter(self.connected_players), None)
+
+    def reset_game(self):
+        for player in self.connected_players.values():
+            player.reset()
+        self.alive_mask = 0
+        self.ghost_mask = 0
+        self.impostor_mask = 0
+        self.sabotage_active = False
+        self.sabotage_ends_at = None
+        self.votes = {}
+        self.crew_done = 0
+        self.crew_total = 0
+        self.progress = 0
+        self.task_views.clear()
+        self.task_responses.clear()
+        self.phase_started.clear()
+        self.clock.cancel_all()
+
+    # ─────────────────────────────────────────────────────────── players
+    def add_player(self, player_id, name):
+        index = lowest_free(self.member_mask)
+        self.member_mask |= bit(index)
+        self.connected_players[player_id] = Player(index, player_id, name)
+
+    def on_join(self, player, name):
+        self.add_player(player, name)
+        self.roster_changed()
+
+    def on_leave(self, player):
+        self.remove_player(player)
+
+    def leave(self, player_id):
+        if player_id in self.connected_players:
+            self.apply("leave", player=player_id)
+
+    def on_player_update(self, player, **fields):
+        for field, value in fields.items():
+            setattr(self.connected_players[player], field, value)
+        self.roster_changed()
+
+    def is_ghost(self, player_id) -> bool:
+        player = self.connected_players.get(player_id)
+        return bool(player and self.ghost_mask & player.mask)
+
+    def is_alive(self, player_id) -> bool:
+        player = self.connected_players.get(player_id)
+        return bool(player and self.alive_mask & player.mask)
+
+    def is_impostor(self, player_id) -> bool:
+        player = self.connected_players.get(player_id)
+        return bool(player and self.impostor_mask & player.mask)
+
+    @property
+    def alive_count(self) -> int:
+        return popcount(self.alive_mask)
+
+    def player_at(self, index):
+        return next(p for p in self.connected_players.values() if p.index == index)
+
+    def roster(self):
+        """Players list and its JSON body, re-rendered only when the roster version moves."""
+        if self.roster_cache is None or self.roster_cache[0] != self.roster_version:
+            players = [
+                {
+                    "id": p.id, "name": p.name, "character": p.character, "ghost": bool(self.ghost_mask & p.mask),
+                    "presence": "online" if p.socket else "away",
+                }
+                for p in self.connected_players.values()
+            ]
+            body = json.dumps({"players": players, "version": self.roster_version}).encode()
+            self.roster_cache = (self.roster_version, players, body)
+        return self.roster_cache
+
+    @property
+    def roster_etag(self):
+        # The uid keeps a reused room code from matching a tag of the old room
+        return f'"{self.code}-{self.uid}-{self.roster_epoch}-{self.roster_version}"'
+
+    def players_update(self):
+        return {
+            "type": "players_update",
+            "players": self.roster()[1],
+            "starter_id": self.leader_id,
+            "version": self.roster_version,
+        }
+
+    def send_player_list(self, player_id):
+        # Same frame for everyone (re)connecting until the roster changes
+        self.send_to(player_id, self.players_update(), cache_key=f"players_update:{self.uid}:{self.roster_version}")
+
+    def roster_changed(self):
+        """Call after any roster mutation: bump the version and push the new list to everyone."""
+        self.roster_version += 1
+        self.broadcast(self.players_update(), coalesce=True)
+
+    def mark_online(self, player_id, socket_id):
+        self.connected_players[player_id].socket = socket_id
+        self.roster_changed()
+
+    def mark_away(self, player_id, socket_id):
+        """Only the socket that went online may take the player away again."""
+        player = self.connected_players.get(player_id)
+        if player and player.socket == socket_id:
+            player.socket = None
+            self.roster_changed()
+
+    def idle_for(self, now: float) -> float:
+        """Seconds nobody has been online in this room, as of monotonic ``now``."""
+        if any(p.socket for p in self.connected_players.values()):
+            self.idle_since = None
+            return 0.0
+        if self.idle_since is None:
+            self.idle_since = now
+        return now - self.idle_since
+
+    def close_if_idle(self, now: float):
+        if self.idle_for(now) >= ROOM_IDLE_TIMEOUT:
+            log.info("Closing idle room", extra={"game": self.game_id})
+            self.close()
+
+    def remove_player(self, player_id):
+        player = self.connected_players.pop(player_id)
+        keep = ~player.mask
+        self.member_mask &= keep
+        self.alive_mask &= keep
+        self.ghost_mask &= keep
+        self.impostor_mask &= keep
+        self.votes.pop(player_id, None)
+        self.task_views.pop(player_id, None)
+        self.task_responses.pop(player_id, None)
+        self.outbox.append({"room": self.code, "close": player_id})
+        if not self.connected_players:
+            self.close()
+        else:
+            self.roster_changed()
+
+    def close(self):
+        """Delete the room everywhere and drop all of its sockets."""
+        store.delete(self.code)
+        self.outbox.append({"room": self.code, "close": None})
+        self.closed = True
+
+    # ─────────────────────────────────────────────────────────── game
+    def assign_player_tasks(self, player_id: str):
+        player = self.connected_players[player_id]
+        player.tasks = ALL_TASKS_MASK
+        player.done = 0
+        self.render_tasks(player_id)
+
+    def has_task(self, player_id: str, task_id) -> bool:
+        player = self.connected_players.get(player_id)
+        return bool(player and player.tasks & TASK_BITS.get(str(task_id), 0))
+
+    def render_tasks(self, player_id: str) -> bytes:
+        """Materialize the player's task list joined with the catalog as a JSON body."""
+        player = self.connected_players.get(player_id)
+        assigned, done = (player.tasks, player.done) if player else (0, 0)
+        tasks = [
+            {**TASKS_BY_ID[task_id], "done": bool(done & task_bit)}
+            for task_id, task_bit in TASK_BITS.items()
+            if assigned & task_bit
+        ]
+        self.task_views[player_id] = tasks
+        body = self.task_responses[player_id] = json.dumps({"tasks": tasks}).encode()
+        return body
+
+    def tasks_response(self, player_id: str) -> bytes:
+        return self.task_responses.get(player_id) or self.render_tasks(player_id)
+
+    def tasks_view(self, player_id: str) -> list:
+        if player_id not in self.task_views:
+            self.render_tasks(player_id)
+        return self.task_views[player_id]
+
+    def spectator_snapshot(self):
+        """Everything a spectator needs on connecting; nothing private to a player."""
+        voting_open = self.voting_open() and self.vote_deadline() > time.time()
+        return {
+            "type": "spectator_snapshot",
+            "game_state": self.game_state,
+            "players": self.spectators.view(self.players_update())["players"],
+            "progress": self.calc_global_progress(),
+            "sabotage": self.sabotage_state(),
+            "vote_deadline": self.vote_deadline() if voting_open else None,
+            "votes_cast": len(self.votes) if voting_open else 0,
+        }
+
+    def send_snapshot(self, player_id):
+        """Everything a (re)connecting client needs, so it does not have to poll."""
+        player = self.connected_players[player_id]
+        self.send_to(player_id, {
+            "type": "snapshot",
+            "game_state": self.game_state,
+            "role": player.role,
+            "character": player.character,
+            "is_ghost": bool(self.ghost_mask & player.mask),
+            "progress": self.calc_global_progress(),
+            "sabotage": self.sabotage_state(),
+            "tasks": self.tasks_view(player_id),
+            "seq": self.seq,
+        })
+
+    def start(self):
+        player_ids = list(self.connected_players.keys())
+        num_players = len(player_ids)
+        num_impostors = calc_num_impostors(num_players)
+
+        roles = ["Impostor"] * num_impostors + ["Crewmate"] * (num_players - num_impostors)
+        characters = [f"ch{i + 1}.png" for i in range(num_players)]
+
+        random.shuffle(roles)
+        random.shuffle(characters)
+        random.shuffle(player_ids)
+
+        self.apply("start", assignment=[list(a) for a in zip(player_ids, roles, characters)])
+        return num_players, num_impostors
+
+    def on_start(self, assignment):
+        self.reset_game()
+        if not self.replaying:
+            GAMES_STARTED.inc()
+        self.alive_mask = self.member_mask
+        self.game_state = "pregame"
+
+        for pid, role, character in assignment:
+            player = self.connected_players[pid]
+            player.role = role
+            player.character = character
+            self.assign_player_tasks(pid)
+            if role == "Impostor":
+                self.impostor_mask |= player.mask
+            else:
+                self.crew_total += popcount(player.tasks)
+
+            # Send role assignment first, then the game start command
+            self.send_to(pid, {
+                "type": "role_assigned",
+                "role": role,
+                "character": character
+            })
+            self.send_to(pid, {
+                "type": "game_start",
+                "redirect": "/game"
+            })
+
+        self.roster_changed()
+
+    def on_end(self):
+        # Keep players connected but clear their game-specific data
+        self.reset_game()
+        self.game_state = "lobby"
+        self.roster_changed()
+
+    def on_game_state(self, state):
+        self.game_state = state
+
+    def on_task(self, player, task, done):
+        """Toggle a task; returns the global progress, ending the game at 100%."""
+        changed = self.set_task(player, task, done)
+        global_progress = self.get_global_progress()
+        if changed and global_progress == 100:
+            self.send_results()
+        return global_progress
+
+    def set_task(self, player_id, task_id, done) -> bool:
+        """Record a task toggle; returns False when the task already had that value."""
+        player = self.connected_players[player_id]
+        task_bit = TASK_BITS[str(task_id)]
+        if bool(player.done & task_bit) == done:
+            return False
+
+        if done:
+            player.done |= task_bit
+        else:
+            player.done &= ~task_bit
+        self.task_views.pop(player_id, None)
+        self.task_responses.pop(player_id, None)
+        self.send_to(player_id, {"type": "task_update", "taskId": task_id, "done": done})
+        # Impostors don't contribute to task progress
+        if not self.impostor_mask & player.mask:
+            self.crew_done += 1 if done else -1
+        return True
+
+    def calc_global_progress(self):
+        if self.crew_total == 0:
+            return 0
+        return round((self.crew_done / self.crew_total) * 100)
+
+    def get_global_progress(self):
+        """Current progress, broadcast only when the rounded percentage moved."""
+        global_progress = self.calc_global_progress()
+
+        if global_progress != self.progress:
+            self.progress = global_progress
+            self.broadcast({
+                "type": "global_progress",
+                "progress": global_progress,
+            }, coalesce=True)
+
+        return global_progress
+
+    # ─────────────────────────────────────────────────────────── timers
+    def phase_begin(self, phase):
+        if not self.replaying:
+            self.phase_started[phase] = time.monotonic()
+
+    def phase_end(self, phase):
+        """Record the phase length; phases begun on another worker are not measured."""
+        started = self.phase_started.pop(phase, None)
+        if started is not None:
+            PHASE_SECONDS.observe(time.monotonic() - started, phase)
+
+    def timer(self, handler, *args):
+        """Clock callback posting ``handler(*args)`` to the room's mailbox."""
+        def fire():
+            self.post(lambda room: handler(*args))
+        return fire
+
+    def on_tick(self, remaining):
+        """One tick per second for all running countdowns of the room."""
+        if "meeting" in remaining:
+            seconds_left = math.ceil(remaining["meeting"])
+            self.post(lambda room: room.broadcast({
+                "type": "emergency_countdown",
+                "seconds_left": seconds_left
+            }, coalesce=True, cache_key=f"emergency_countdown:{seconds_left}"), write=False)
+
+    # ─────────────────────────────────────────────────────────── sabotage
+    def sabotage_state(self):
+        ends_at = self.sabotage_ends_at
+        return {
+            "active": self.sabotage_active,
+            "endsAt": ends_at,
+            "cooldownEndsAt": ends_at - SABOTAGE_DURATION + SABOTAGE_COOLDOWN if ends_at else None,
+        }
+
+    def start_sabotage(self):
+        self.apply("sabotage", ends_at=time.time() + SABOTAGE_DURATION)
+
+    def on_sabotage(self, ends_at):
+        self.phase_begin("sabotage")
+        self.sabotage_active = True
+        self.sabotage_ends_at = ends_at
+        self.clock.schedule("sabotage", SABOTAGE_DURATION, self.timer(self.end_sabotage))
+        self.clock.schedule("sabotage_cooldown", SABOTAGE_COOLDOWN, self.timer(self.sabotage_ready))
+        self.broadcast({"type": "sabotage_active", **self.sabotage_state()})
+
+    def end_sabotage(self):
+        self.apply("sabotage_end")
+
+    def on_sabotage_end(self):
+        self.phase_end("sabotage")
+        self.sabotage_active = False
+        self.broadcast({"type": "sabotage_ended", **self.sabotage_state()})
+
+    def sabotage_ready(self):
+        self.broadcast({"type": "sabotage_ready"})
+
+    # ─────────────────────────────────────────────────────────── meetings
+    def begin_meeting(self):
+        """Start the countdown to voting; a countdown already running is superseded."""
+        self.clock.cancel("vote")
+        # The last round's vote is over; until start_voting only the countdown runs
+        self.vote_start_time = None
+        self.clock.schedule("meeting", MEETING_COUNTDOWN, self.timer(self.start_voting), tick=True)
+        self.phase_begin("emergency")
+
+    def on_emergency(self, caller):
+        self.game_state = "emergency"
+
+        # Broadcast emergency flash to all players
+        self.broadcast({
+            "type": "emergency_flash",
+            "caller_name": self.connected_players[caller].name
+        })
+
+        # Start countdown to redirect to vote
+        self.begin_meeting()
+
+    def on_report(self, player) -> bool:
+        """Ghost the reported body and call a meeting; False when that ended the game."""
+        self.make_ghost(player)
+        self.game_state = "vote"
+
+        if self.too_few_alive():
+            self.send_results()
+            return False
+
+        reported = self.connected_players[player]
+
+        # Notify all players about the report
+        self.broadcast({
+            "type": "report",
+            "name": reported.name,
+            "character": reported.character,
+        })
+
+        self.begin_meeting()
+        return True
+
+    def start_voting(self):
+        self.apply("voting", started_at=time.time())
+
+    def on_voting(self, started_at):
+        self.phase_end("emergency")
+        self.phase_begin("vote")
+        # Initialize voting state
+        self.game_state = "vote"
+        self.votes = {}
+        self.vote_start_time = started_at
+
+        # The only timing message of the vote; clients count down to the deadline themselves
+        self.broadcast({
+            "type": "vote_started",
+            "deadline": self.vote_deadline(),
+            "time_left": VOTE_DURATION,
+            # A copy: the message stays in the resume buffer while votes come in
+            "votes": dict(self.votes)
+        })
+
+        self.clock.schedule("vote", VOTE_DURATION, self.timer(self.vote_timeout, started_at))
+
+    def voting_open(self) -> bool:
+        """A vote is running. A report sets game_state to "vote" already, during the countdown to it."""
+        return self.game_state == "vote" and self.vote_start_time is not None
+
+    def vote_deadline(self):
+        return self.vote_start_time + VOTE_DURATION
+
+    def vote_time_left(self):
+        if not self.voting_open():
+            return 0
+        return max(0, VOTE_DURATION - (time.time() - self.vote_start_time))
+
+    def on_vote(self, voter, target) -> bool:
+        """Record a vote (a second one overwrites); True when it was the last one and resolved the vote."""
+        self.votes[voter] = target
+
+        if len(self.votes) == self.alive_count:
+            self.calculate_result()
+            return True
+
+        # Only the new vote goes out; clients fold it into their own map
+        self.broadcast({
+            "type": "vote_cast",
+            "voter": voter,
+            "target": target
+        })
+        return False
+
+    def vote_timeout(self, started_at):
+        self.apply("vote_timeout", started_at=started_at)
+
+    def on_vote_timeout(self, started_at=None):
+        # End voting if time's up, unless the last vote already resolved this round
+        if self.game_state == "vote" and started_at in (None, self.vote_start_time):
+            self.calculate_result()
+
+    def too_few_alive(self):
+        return self.alive_count <= (2 + calc_num_impostors(len(self.connected_players)))
+
+    def end_voting(self):
+        if self.too_few_alive():
+            self.game_state = "after_game"
+        else:
+            self.game_state = "game"
+
+    def ballot(self):
+        """Cast votes as target indices for the vote engine; unknown targets count as skips."""
+        players = self.connected_players
+        return [players[target].index if target in players else voting.SKIP for target in self.votes.values()]
+
+    def make_ghost(self, player_id):
+        mask = self.connected_players[player_id].mask
+        self.alive_mask &= ~mask
+        self.ghost_mask |= mask
+        self.roster_changed()
+
+    def calculate_result(self):
+        self.clock.cancel("vote")
+        self.phase_end("vote")
+        ejected_index = voting.resolve(self.ballot(), self.alive_count, VOTE_RULES)
+
+        # Handle case where someone was ejected
+        if ejected_index != voting.NO_EJECTION:
+            ejected = self.player_at(ejected_index)
+            self.make_ghost(ejected.id)
+
+            # Check if game should end
+            if self.too_few_alive() or (ejected.role == "Impostor" and not self.impostor_mask & self.alive_mask):
+                self.send_results()
+                return
+
+            # Send ejection results to all players
+            self.broadcast({
+                "type": "results",
+                "ejected": {
+                    "name": ejected.name,
+                    'character': ejected.character,
+                    'role': ejected.role,
+                }
+            })
+
+        # Handle case where no one was ejected
+        else:
+            self.broadcast({
+                "type": "results",
+                "ejected": None  # Explicitly indicate no ejection
+            })
+
+        self.end_voting()
+
+    def winner(self):
+        pg = self.calc_global_progress()
+
+        if pg == 100:
+            return "Crew"
+        if self.impostor_mask & self.alive_mask:
+            return "Impostor"
+        return "Crew"
 
-    async def send_personal_message(self, message: dict, player_id: str):
-        if player_id in self.active_connections:
-            await self.active_connections[player_id].send_json(message)
+    def send_results(self):
+        winner = self.winner()
+        self.game_state = 'aftergame'
+        if not self.replaying:
+            GAMES_WON.inc(winner)
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections.values():
-            await connection.send_json(message)
+        self.broadcast({
+            "type": "game_end",
+            'winner': winner,
+        })
 
-manager = ConnectionManager()
+# Rooms this worker has touched; the store decides whether a code still exists
+rooms: Dict[str, GameRoom] = {}
+
+def deliver(envelope):
+    """Hand a published envelope to the sockets connected to this worker."""
+    room = rooms.get(envelope["room"])
+    if room is None:
+        return
+
+    if "seq" in envelope:
+        room.history.append(envelope)
+
+    if "watch" in envelope:
+        if room.spectators.viewers:
+            room.spectators.offer(envelope["watch"])
+    elif "close" in envelope:
+        if envelope["close"] is None:
+            room.manager.close_all()
+            room.spectators.close_all()
+            room.clock.stop()
+            rooms.pop(room.code, None)
+        else:
+            room.manager.close(envelope["close"])
+    elif envelope.get("to"):
+        room.manager.send_personal_message(envelope["message"], envelope["to"], envelope.get("cache_key"))
+    else:
+        room.manager.broadcast(
+            envelope["message"], exclude=envelope.get("exclude"), coalesce=envelope.get("coalesce"),
+            cache_key=envelope.get("cache_key"),
+        )
+        if room.spectators.viewers:
+            room.spectators.offer(envelope["message"])
+
+channel.deliver = deliver
+
+def create_room() -> GameRoom:
+    while True:
+        code = "".join(random.choices(ROOM_CODE_ALPHABET, k=ROOM_CODE_LENGTH))
+        if store.create(code):
+            break
+    room = rooms[code] = GameRoom(code)
+    return room
+
+def load_room(code) -> GameRoom:
+    """Cached room object for ``code``; its transaction() checks the room still exists."""
+    room = rooms.get(code)
+    if room is None:
+        if not code or not store.keeps_state:
+            raise RoomNotFound(code)
+        # Registered right away, so concurrent first requests share one room and one actor
+        room = rooms.setdefault(code, GameRoom(code))
+    return room
+
+def replay_game(path: Path, code: str = None, snapshot: bool = True) -> GameRoom:
+    """Rebuild a game from its log as room ``code`` (by default the one it was recorded as).
+
+    Starts from the snapshot unless ``snapshot`` is False, then applies the
+    events after it. No timers are left running and nothing is sent.
+    """
+    recorded_code, uid = path.name[:-len(".jsonl")].removesuffix(".closed").split("-", 1)
+    code = code or recorded_code
+    if not store.create(code):
+        raise ValueError(f"Room {code} already exists")
+    room = rooms[code] = GameRoom(code)
+    room.replaying = True
+    room.clock.autorun = False
+    after, state = read_snapshot(path) if snapshot else (0, None)
+    with room.transaction():
+        if state:
+            room.load_state(state)
+        room.uid = uid
+        for event in read_events(path, after):
+            room.apply(event["kind"], **event["data"])
+        # Sockets died with the process that recorded the log
+        for player in room.connected_players.values():
+            player.socket = None
+        room.clock.cancel_all()
+        # Number the replayed messages like the originals, then drop them
+        room.stamp_outbox()
+        room.outbox.clear()
+    room.replaying = False
+    room.clock.autorun = True
+    return room
+
+def restore_games():
+    """Bring back the games that were running when the server stopped.
+
+    Only for the single-worker memory store; the SQLite store keeps rooms
+    itself. Newest log wins when a code was reused.
+    """
+    if not EVENT_LOG_DIR or store.keeps_state or not Path(EVENT_LOG_DIR).is_dir():
+        return
+    paths = sorted(Path(EVENT_LOG_DIR).glob("*.jsonl"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in paths:
+        if path.name.endswith(".closed.jsonl"):
+            continue
+        if time.time() - path.stat().st_mtime >= ROOM_IDLE_TIMEOUT:
+            # Abandoned long enough that the reaper would have closed it
+            code, uid = path.name[:-len(".jsonl")].split("-", 1)
+            EventLog(Path(EVENT_LOG_DIR), code, uid).finish()
+            continue
+        try:
+            room = replay_game(path)
+        except Exception:
+            log.warning("Could not restore %s", path.name, exc_info=True)
+            continue
+        room.log = EventLog(Path(EVENT_LOG_DIR), room.code, room.uid)
+        room.roster_epoch = uuid.uuid4().hex[:8]
+        room.rearm()
+        log.info("Restored room (%d events, %s)", room.events, room.game_state, extra={"game": room.game_id})
+
+async def flush_logs():
+    """Write buffered log lines out on a short interval, so little is lost on a crash."""
+    profiler.label("flush_logs")
+    while True:
+        await asyncio.sleep(LOG_FLUSH_INTERVAL)
+        for room in list(rooms.values()):
+            if room.log:
+                room.log.flush()
+
+async def reap_idle_rooms():
+    """Close rooms nobody has been online in for ROOM_IDLE_TIMEOUT; their logs are finished."""
+    profiler.label("reap_idle_rooms")
+    while True:
+        await asyncio.sleep(REAP_INTERVAL)
+        now = time.monotonic()
+        for room in list(rooms.values()):
+            try:
+                if await room.call(lambda room: room.idle_for(now) >= ROOM_IDLE_TIMEOUT, write=False):
+                    # Checked again in the write, someone may have come back meanwhile
+                    await room.call(lambda room: room.close_if_idle(now))
+            except RoomNotFound:
+                rooms.pop(room.code, None)
+            except Exception:
+                log.exception("Idle room sweep failed", extra={"game": room.game_id})
+
+async def watch_loop_lag():
+    """Sleep on a fixed interval and record how late each wakeup comes."""
+    profiler.label("watch_loop_lag")
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        LOOP_LAG.observe(max(0.0, time.perf_counter() - started - LAG_INTERVAL))
+
+def count_players():
+    counts = {("online",): 0, ("away",): 0}
+    for room in rooms.values():
+        for player in room.connected_players.values():
+            counts[("online",) if player.socket else ("away",)] += 1
+    return counts
+
+def queue_depths():
+    depths = [len(conn.pending) for room in rooms.values() for conn in room.manager.active_connections.values()]
+    return {("total",): sum(depths), ("max",): max(depths, default=0)}
+
+metrics.Gauge("amongus_rooms", "Rooms loaded in this worker", collect=lambda: {(): len(rooms)})
+metrics.Gauge("amongus_games_active", "Loaded rooms with a game past the lobby", collect=lambda: {
+    (): sum(1 for room in rooms.values() if room.game_state != "lobby")
+})
+metrics.Gauge("amongus_players", "Players of the loaded rooms by presence", ("presence",), collect=count_players)
+metrics.Gauge("amongus_sockets", "Open /ws connections on this worker", collect=lambda: {
+    (): sum(len(room.manager.active_connections) for room in rooms.values())
+})
+metrics.Gauge("amongus_outbound_queue_frames", "Frames waiting in socket queues", ("stat",), collect=queue_depths)
+metrics.Gauge("amongus_spectators", "Spectator sockets on this worker", collect=lambda: {
+    (): sum(len(room.spectators.viewers) for room in rooms.values())
+})
+metrics.Gauge("amongus_mailbox_commands", "Commands waiting for room actors", collect=lambda: {
+    (): sum(len(room.mailbox) for room in rooms.values())
+})
+
+def identify(conn: HTTPConnection):
+    """``(player_id, room)`` from the player token cookie, ``(None, None)`` without a valid one."""
+    if "player" not in conn.scope:
+        token = conn.cookies.get(TOKEN_COOKIE)
+        conn.scope["player"] = (token and signer.verify(token)) or (None, None)
+        logs.player_id.set(conn.scope["player"][0])
+    return conn.scope["player"]
+
+def player_of(conn: HTTPConnection):
+    return identify(conn)[0]
+
+def get_room(request: Request) -> GameRoom:
+    """Room of the player behind this request's token."""
+    return load_room(identify(request)[1])
+
+@app.exception_handler(RoomNotFound)
+async def room_not_found(request: Request, exc: RoomNotFound):
+    return JSONResponse(status_code=404, content={"detail": "Room not found"})
+
+def calc_num_impostors(num_players):
+    if num_players < 8:
+        return 1
+    else:
+        return 2
 
 @app.post("/api/join")
-async def join_game(request: Request):
-    global connected_players, game_state
+async def join_game(request: Request, response: Response):
     data = await request.json()
     name = data.get("name", "").strip()
+    code = (data.get("room") or "").strip().upper()
 
     if not name:
         return JSONResponse(status_code=400, content={"error": "Name required"})
 
-    if len(connected_players) >= MAX_PLAYERS:
-        return JSONResponse(status_code=400, content={"error": "Lobby full"})
-
+    room = load_room(code) if code else create_room()
     player_id = str(uuid.uuid4())
-    request.session["player_id"] = player_id
-    request.session["name"] = name
-    game_state = "lobby"
-    
-    connected_players[player_id] = {
-        "id": player_id,
-        "name": name,
-        "ws": None,
-        "session": request.session
-    }
+    logs.player_id.set(player_id)
 
-    await broadcast_player_list()
+    def join(room):
+        if len(room.connected_players) >= MAX_PLAYERS:
+            return JSONResponse(status_code=400, content={"error": "Lobby full"})
+        room.apply("join", player=player_id, name=name)
 
-    return {"playerId": player_id, "playerName": name}
+    error = await room.call(join)
+    if error:
+        return error
 
-@app.get("/api/players")
-async def get_players():
-    await broadcast_player_list()
-    players = [{"id": p["id"], "name": p["name"], "character": p["session"]["character"], "ghost": p["session"].get("is_ghost", False)} for p in connected_players.values()]
+    # The only place the cookie is written, apart from clearing it on leave
+    response.set_cookie(TOKEN_COOKIE, signer.issue(player_id, room.code), max_age=TOKEN_TTL, httponly=True, samesite="lax")
+
+    return {"playerId": player_id, "playerName": name, "room": room.code}
 
-    return {"players": players}
+@app.get("/api/players")
+async def get_players(request: Request):
+    room = get_room(request)
+    etag, body = await room.call(lambda room: (room.roster_etag, room.roster()[2]), write=False)
 
-async def broadcast_player_list():
-    players = [{"id": p["id"], "name": p["name"]} for p in connected_players.values()]
-    await manager.broadcast({
-        "type": "players_update",
-        "players": players,
-        "starter_id": players[0]["id"] if players else None
-    })
+    # Clients revalidate with If-None-Match and get an empty 304 while nothing changed
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    global connected_players
     player_id = None
-    
+    room = None
+    socket_id = uuid.uuid4().hex
+
+    profiler.label("/ws")
     await websocket.accept()
-    
+
     try:
         # Initial authentication
         auth_data = await websocket.receive_json()
-        if auth_data.get("type") != "auth":
+        if auth_data.get("type") not in ("auth", "spectate"):
             await websocket.close(code=1008, reason="Auth required")
             return
 
+        # Clients that offer formats get the chosen one (and the type code table) as JSON first
+        fmt = wire.JSON
+        if "formats" in auth_data:
+            fmt = wire.negotiate(auth_data["formats"])
+            await websocket.send_text(json.dumps({"type": "welcome", "format": fmt, "types": wire.MESSAGE_TYPES}))
+
+        if auth_data["type"] == "spectate":
+            await spectate(websocket, auth_data.get("room"), fmt)
+            return
+
         player_id = auth_data.get("player_id")
-        if not player_id or player_id not in connected_players:
+        logs.player_id.set(player_id)
+
+        try:
+            room = load_room(auth_data.get("room") or identify(websocket)[1])
+
+            def attach(room):
+                if player_id not in room.connected_players:
+                    return False
+                # Store WebSocket connection
+                room.manager.connect(player_id, websocket, fmt)
+
+                # A reconnecting client gets what it missed, or a fresh snapshot
+                last_seq = auth_data.get("last_seq")
+                if not isinstance(last_seq, int) or not room.resume(player_id, last_seq):
+                    room.send_player_list(player_id)
+                    room.send_snapshot(player_id)
+                return True
+
+            known = await room.call(attach, write=False)
+            logs.game_id.set(room.game_id)
+        except RoomNotFound:
+            await websocket.close(code=1008, reason="Invalid room")
+            return
+
+        if not player_id or not known:
             await websocket.close(code=1008, reason="Invalid player ID")
             return
 
-        # Store WebSocket connection
-        connected_players[player_id]["ws"] = websocket
-        
-        # Send initial data
-        await send_player_list(websocket)
-        await broadcast_player_list(exclude=player_id)
+        def online(room):
+            if player_id in room.connected_players:
+                room.mark_online(player_id, socket_id)
+
+        await room.call(online)
 
         # Main message loop
         while True:
             try:
-                data = await websocket.receive_json()
-                
-                if data.get("type") == "join":
+                # Any message counts as a heartbeat; a socket that stays silent is dead
+                data = await asyncio.wait_for(websocket.receive_json(), HEARTBEAT_TIMEOUT)
+
+                if data.get("type") == "ping":
+                    room.manager.send_personal_message({"type": "pong"}, player_id, cache_key="pong")
+
+                elif data.get("type") == "join":
                     # Handle join message (if still needed)
-                    if player_id in connected_players:
-                        connected_players[player_id]["ws"] = websocket
-                        
-                        await websocket.send_json({
-                            "type": "players_update",
-                            "players": [
-                                {"id": p["id"], "name": p["name"]}
-                                for p in connected_players.values()
-                            ],
-                            "starter_id": list(connected_players)[0]
-                        })
-                        await broadcast_player_list()
-                
+                    def rejoin(room):
+                        if player_id in room.connected_players:
+                            room.manager.connect(player_id, websocket, fmt)
+                            room.send_player_list(player_id)
+
+                    await room.call(rejoin, write=False)
+
+                elif data.get("type") == "snapshot":
+                    def snapshot(room):
+                        if player_id in room.connected_players:
+                            room.send_snapshot(player_id)
+
+                    await room.call(snapshot, write=False)
+
                 # Add other message type handlers here
-                
+
             except json.JSONDecodeError:
-                await websocket.send_json({"error": "Invalid JSON format"})
+                room.manager.send_personal_message({"error": "Invalid JSON format"}, player_id)
             except KeyError as e:
-                await websocket.send_json({"error": f"Missing field: {str(e)}"})
+                room.manager.send_personal_message({"error": f"Missing field: {str(e)}"}, player_id)
 
     except WebSocketDisconnect:
-        print(f"Player {player_id} disconnected")
+        log.info("Player disconnected")
+    except asyncio.TimeoutError:
+        log.info("Reaping silent connection")
+        SOCKET_DROPS.inc("heartbeat")
+        try:
+            await websocket.close(code=1001, reason="Heartbeat timeout")
+        except Exception:
+            pass
     except Exception as e:
-        print(f"WebSocket error for player {player_id}: {str(e)}")
+        log.warning("WebSocket error: %r", e)
     finally:
-        if player_id and player_id in connected_players:
-            # Only clear if no new connection was established
-            if connected_players[player_id]["ws"] == websocket:
-                connected_players[player_id]["ws"] = None
-            await broadcast_player_list()
-
-async def send_player_list(websocket):
-    players = [{"id": p["id"], "name": p["name"], "ghost": p["session"].get("is_ghost", False)} for p in connected_players.values()]
-    await websocket.send_json({
-        "type": "players_update",
-        "players": players,
-        "starter_id": players[0]["id"] if players else None
-    })
-
-async def broadcast_player_list(exclude=None):
-    players = [{"id": p["id"], "name": p["name"]} for p in connected_players.values()]
-    message = {
-        "type": "players_update",
-        "players": players,
-        "starter_id": players[0]["id"] if players else None
-    }
-    
-    for pid, player in connected_players.items():
-        if pid != exclude and player["ws"]:
+        if room and player_id:
+            room.manager.disconnect(player_id, websocket)
             try:
-                await player["ws"].send_json(message)
-            except:
-                player["ws"] = None
+                await room.call(lambda room: room.mark_away(player_id, socket_id))
+            except RoomNotFound:
+                pass
+
+async def spectate(websocket: WebSocket, code, fmt):
+    """Read-only stream of a room for anyone with its code, see SpectatorHub."""
+    profiler.label("/ws spectator")
+    try:
+        room = load_room(str(code or "").strip().upper())
+        viewer_id = await room.call(
+            lambda room: room.spectators.add(websocket, fmt, room.spectator_snapshot()), write=False)
+    except RoomNotFound:
+        await websocket.close(code=1008, reason="Invalid room")
+        return
+    logs.game_id.set(room.game_id)
+    if viewer_id is None:
+        await websocket.close(code=1013, reason="Too many spectators")
+        return
+
+    try:
+        while True:
+            data = await asyncio.wait_for(websocket.receive_json(), HEARTBEAT_TIMEOUT)
+            if data.get("type") == "ping":
+                room.spectators.send(viewer_id, {"type": "pong"}, cache_key="pong")
+    finally:
+        room.spectators.remove(viewer_id)
 
 @app.get("/api/session")
 async def get_session(request: Request):
-    player_id = request.session.get("player_id")
-    name = request.session.get("name")
+    player_id = player_of(request)
 
-    if not player_id or not name:
+    if not player_id:
         raise HTTPException(status_code=403, detail="Not joined")
 
-    return {
-        "player_id": player_id,
-        "name": name,
-        "game_state": game_state,
-        "role": player_roles.get(player_id, {}).get("role") if player_roles else None,
-        "character": player_roles.get(player_id, {}).get("character") if player_roles else None,
-        "is_ghost": player_id in ghost_players
-    }
+    room = get_room(request)
 
-def calc_num_impostors(num_players):
-    if num_players < 8:
-        return 1
-    else:
-        return 2
+    def session(room):
+        player = room.connected_players.get(player_id)
+        if player is None:
+            raise HTTPException(status_code=403, detail="Not joined")
 
-def assign_player_tasks(player_id: str):
-    global ALL_TASKS, players_tasks
-    players_tasks[player_id] = {}
+        return {
+            "player_id": player_id,
+            "name": player.name,
+            "room": room.code,
+            "game_state": room.game_state,
+            "role": player.role,
+            "character": player.character,
+            "is_ghost": room.is_ghost(player_id)
+        }
+
+    return await room.call(session, write=False)
 
-    for task in ALL_TASKS:
-        if not isinstance(task, dict):
-            print(f"Warning: task is not a dict: {task}")
-            continue
-        if "id" not in task:
-            print(f"Warning: task has no 'id': {task}")
-            continue
-        
-        players_tasks[player_id][str(task["id"])] = False
-    
 @app.post("/api/start")
 async def start_game(request: Request):
-    global player_roles, game_state, connected_players, alive_players, players_tasks, sabotage_timers, votes, ghost_players
-    
-    player_id = request.session.get("player_id")
+    player_id = player_of(request)
     if not player_id:
         raise HTTPException(status_code=403, detail="Not authenticated")
-    
-    # Only first player can start
-    if connected_players and player_id != list(connected_players.keys())[0]:
-        raise HTTPException(status_code=403, detail="Only lobby leader can start")
-
-    if not connected_players:
-        return JSONResponse(status_code=400, content={"error": "No players connected"})
-
-    player_ids = list(connected_players.keys())
-    num_players = len(player_ids)
-    num_impostors = calc_num_impostors(num_players)
-    alive_players = player_ids.copy()
-
-    player_roles = None
-    players_tasks = {}
-    sabotage_timers = {}
-    votes.clear()
-    ghost_players.clear()
-
-    roles = ["Impostor"] * num_impostors + ["Crewmate"] * (num_players - num_impostors)
-    characters = [f"ch{i + 1}.png" for i in range(num_players)]
-
-    random.shuffle(roles)
-    random.shuffle(characters)
-    random.shuffle(player_ids)
-
-    player_roles = {}
-    game_state = "pregame"
-
-    for i, pid in enumerate(player_ids):
-        role = roles[i]
-        character = characters[i]
-        player_roles[pid] = {"role": role, "character": character}
-        assign_player_tasks(pid)
-
-        player = connected_players[pid]
-        player["session"]["role"] = role
-        player["session"]["character"] = character
-        player["session"]["is_ghost"] = False
-
-        if player.get("ws"):
-            try:
-                # Send role assignment first
-                await player["ws"].send_json({
-                    "type": "role_assigned",
-                    "role": role,
-                    "character": character
-                })
-                # Then send game start command
-                await player["ws"].send_json({
-                    "type": "game_start",
-                    "redirect": "/game"
-                })
-            except Exception as e:
-                print(f"Error sending to {pid}: {e}")
 
-    return {"message": "Game started", "players": len(player_ids), "impostors": num_impostors}
+    room = get_room(request)
+
+    def start(room):
+        # Only first player can start
+        if room.connected_players and player_id != room.leader_id:
+            raise HTTPException(status_code=403, detail="Only lobby leader can start")
+
+        if not room.connected_players:
+            return JSONResponse(status_code=400, content={"error": "No players connected"})
+
+        num_players, num_impostors = room.start()
+        return {"message": "Game started", "players": num_players, "impostors": num_impostors}
+
+    return await room.call(start)
 
 @app.post("/api/gamestate")
 async def update_game_state(request: Request):
+    room = get_room(request)
     try:
         data = await request.json()
         new_state = data.get("state")
-        
+
         if not new_state:
             raise HTTPException(status_code=400, detail="Missing state parameter")
-            
+
         valid_states = ["lobby", "pregame", "game", "vote"]
         if new_state not in valid_states:
             raise HTTPException(
-                status_code=400, 
+                status_code=400,
                 detail=f"Invalid game state. Must be one of: {', '.join(valid_states)}"
             )
 
         # Update game state (consider using a proper state management solution)
-        global game_state
-        game_state = new_state
-        
-        return {"status": "success", "state": game_state}
-        
+        await room.call(lambda room: room.apply("game_state", state=new_state))
+
+        return {"status": "success", "state": new_state}
+
+    except RoomNotFound:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
+
 # ───────────────────────────────────────────────────────────── tasky
 # Nový endpoint na aktualizáciu úlohy hráča
 @app.get("/api/tasks")
 async def get_tasks(request: Request):
-    player_id = request.session.get("player_id")
+    player_id = player_of(request)
     if not player_id:
         raise HTTPException(status_code=403, detail="Not authenticated")
 
-    # Example players_tasks[player_id]: {"3": False, "5": True}
-    assigned_tasks = players_tasks.get(player_id, {})
-
-    # Join with full task data
-    full_tasks = []
-    for task_id, done in assigned_tasks.items():
-        task_data = next((t for t in ALL_TASKS if str(t["id"]) == str(task_id)), None)
-        if task_data:
-            full_tasks.append({
-                **task_data,
-                "done": done
-            })
+    room = get_room(request)
+    # Cached body of the player's task masks joined with the catalog
+    body = await room.call(lambda room: room.tasks_response(player_id), write=False)
 
-    return {"tasks": full_tasks}
+    return Response(content=body, media_type="application/json")
 
 @app.post("/api/update-task")
 async def update_task(request: Request):
-    global players_tasks, connected_players, TOTAL_TASKS
+    room = get_room(request)
     data = await request.json()
     player_id = data.get("playerId")
     task_id = data.get("taskId")
@@ -360,196 +1704,124 @@ async def update_task(request: Request):
     if not player_id or task_id is None or not isinstance(done, bool):
         return JSONResponse(status_code=400, content={"error": "Missing or invalid parameters"})
 
-    if player_id not in connected_players:
-        return JSONResponse(status_code=404, content={"error": "Player not connected"})
-
-    start_time = sabotage_timers.get(player_id, 0)
-
-    if time.time() - start_time < SABOTAGE_DURATION:
-        return JSONResponse(
-            status_code=403,
-            content={"error": "Tasks locked during sabotage"}
-        )
-    
-    # Inicializuj úlohy hráča, ak ešte nemá
-    if player_id not in players_tasks:
-        players_tasks[player_id] = {}
+    def toggle_task(room):
+        if player_id not in room.connected_players:
+            return JSONResponse(status_code=404, content={"error": "Player not connected"})
 
-    players_tasks[player_id][str(task_id)] = done
+        if room.sabotage_active:
+            return JSONResponse(
+                status_code=403,
+                content={"error": "Tasks locked during sabotage"}
+            )
 
-    global_progress = await get_global_progress()
+        if not room.has_task(player_id, task_id):
+            return JSONResponse(status_code=400, content={"error": "Unknown task"})
 
-    if global_progress == 100:
-        await send_results()
-        game_state = "aftergame"
-        return
+        global_progress = room.apply("task", player=player_id, task=task_id, done=done)
+        return {"globalProgress": global_progress}
 
-    return {"globalProgress": global_progress}
+    return await room.call(toggle_task)
 
 # Endpoint na získanie globálneho progresu
-async def get_global_progress():
-
-    total_done = 0
-    total_possible = 0
-    
-    for player_id, tasks in players_tasks.items():
-        # Skip impostors - they don't contribute to task progress
-        if player_roles.get(player_id)["role"] == "Impostor":
-            continue
-            
-        # Count completed tasks for crewmates only
-        completed = sum(1 for is_done in tasks.values() if is_done)
-        total_done += completed
-        total_possible += TOTAL_TASKS
-    
-    if total_possible == 0:
-        global_progress = 0
-    else:
-        global_progress = round((total_done / total_possible) * 100)
-
-    players = [{"id": p["id"], "name": p["name"]} for p in connected_players.values()]
-    message = {
-        "type": "global_progress",
-        "progress": global_progress,
-    }
-    
-    for pid, player in connected_players.items():
-        try:
-            await player["ws"].send_json(message)
-        except:
-            player["ws"] = None
-
-    return global_progress
-
 @app.get("/api/global-progress")
 async def get_global_progress_endpoint(request: Request):
-    player_id = request.session.get("player_id")
+    player_id = player_of(request)
     if not player_id:
         raise HTTPException(status_code=403, detail="Not authenticated")
 
-    total_done = 0
-    total_possible = 0
-    
-    for player_id, tasks in players_tasks.items():
-        # Skip impostors - they don't contribute to task progress
-        if player_roles.get(player_id)["role"] == "Impostor":
-            continue
-            
-        # Count completed tasks for crewmates only
-        completed = sum(1 for is_done in tasks.values() if is_done)
-        total_done += completed
-        total_possible += TOTAL_TASKS
-    
-
-    global_progress = 0 if total_possible == 0 else round((total_done / total_possible) * 100)
-
-    return {"globalProgress": global_progress}
+    room = get_room(request)
+    return await room.call(lambda room: {"globalProgress": room.calc_global_progress()}, write=False)
 
 @app.post("/api/sabotage")
 async def start_sabotage(request: Request):
-    player_id = request.session.get("player_id")
+    player_id = player_of(request)
     if not player_id:
         return JSONResponse(status_code=403, content={"error": "Unauthorized"})
-    
-    # Only impostors can start sabotage
-    if player_roles.get(player_id, {}).get('role') != "Impostor":
-        return JSONResponse(status_code=403, content={"error": "Only impostors can sabotage"})
-
-    current_time = time.time()
-
-    # Check if a sabotage is active for *anyone* (shared sabotage state)
-    active_sabotage = None
-    if sabotage_timers:
-        # Get the earliest start time of an active sabotage
-        earliest_start = min(sabotage_timers.values())
-        elapsed = current_time - earliest_start
-        if elapsed < SABOTAGE_DURATION:
+
+    room = get_room(request)
+
+    def sabotage(room):
+        # Only impostors can start sabotage
+        if not room.is_impostor(player_id):
+            return JSONResponse(status_code=403, content={"error": "Only impostors can sabotage"})
+
+        # A sabotage is shared by everyone in the room
+        if room.sabotage_active:
             # Sabotage still running
-            remaining = max(0, SABOTAGE_DURATION - elapsed)
-            cooldown_remaining = max(0, SABOTAGE_COOLDOWN - elapsed)
+            current_time = time.time()
+            elapsed = current_time - (room.sabotage_ends_at - SABOTAGE_DURATION)
             return {
                 "active": True,
-                "remaining": remaining,
-                "endsAt": earliest_start + SABOTAGE_DURATION,
-                "cooldown": cooldown_remaining
+                "remaining": max(0, room.sabotage_ends_at - current_time),
+                "endsAt": room.sabotage_ends_at,
+                "cooldown": max(0, SABOTAGE_COOLDOWN - elapsed)
             }
 
-    # Otherwise, start new sabotage
-    for pid in player_roles.keys():
-        sabotage_timers[pid] = current_time
+        # Otherwise, start new sabotage
+        room.start_sabotage()
 
-    for pid, player in connected_players.items():
-       if player.get("ws"):
-            try:
-                await player["ws"].send_json({
-                    "type": "sabotage_active",
-                })
-            except Exception as e:
-                print(f"Error sending redirect to {pid}: {e}")
+        return {
+            "message": "Sabotage started",
+            "duration": SABOTAGE_DURATION,
+            "cooldown": SABOTAGE_COOLDOWN,
+            "active": True,
+            "endsAt": room.sabotage_ends_at
+        }
 
-    return {
-        "message": "Sabotage started",
-        "duration": SABOTAGE_DURATION,
-        "cooldown": SABOTAGE_COOLDOWN,
-        "active": True,
-        "endsAt": current_time + SABOTAGE_DURATION
-    }
+    return await room.call(sabotage)
 
 @app.get("/api/sabotage")
 async def get_sabotage(request: Request):
-    player_id = request.session.get("player_id")
+    player_id = player_of(request)
     if not player_id:
         return JSONResponse(status_code=403, content={"error": "Unauthorized"})
 
-    start_time = sabotage_timers.get(player_id)
-    if not start_time:
+    room = get_room(request)
+    active, ends_at = await room.call(lambda room: (room.sabotage_active, room.sabotage_ends_at), write=False)
+    if not ends_at:
         return JSONResponse(status_code=404, content={"error": "No active sabotage"})
 
-    elapsed = time.time() - start_time
-    remaining = max(0, SABOTAGE_DURATION - elapsed)
+    elapsed = time.time() - (ends_at - SABOTAGE_DURATION)
 
     return {
-        "active": remaining > 0,
-        "remaining": remaining,
-        "endsAt": start_time + SABOTAGE_DURATION,
-        "cooldown": SABOTAGE_COOLDOWN - elapsed   
+        "active": active,
+        "remaining": max(0, SABOTAGE_DURATION - elapsed) if active else 0,
+        "endsAt": ends_at,
+        "cooldown": SABOTAGE_COOLDOWN - elapsed
     }
 
 # ───────────────────────────────────────────────────────────── session management
 @app.post("/api/session/leave")
-async def leave_game(request: Request):
-    player_id = request.session.get("player_id")
-    if player_id and player_id in connected_players:
-        # Clean up player data
-        if connected_players[player_id].get("ws"):
-            try:
-                await connected_players[player_id]["ws"].close()
-            except:
-                pass
-        del connected_players[player_id]
-    
+async def leave_game(request: Request, response: Response):
+    player_id = player_of(request)
+    try:
+        room = get_room(request)
+        await room.call(lambda room: room.leave(player_id))
+    except RoomNotFound:
+        pass
+
     # Clear session
-    request.session.clear()
+    response.delete_cookie(TOKEN_COOKIE)
     return {"message": "Left game"}
 
 @app.post("/api/update-session")
 async def update_session(request: Request):
-    player_id = request.session.get("player_id")
+    player_id = player_of(request)
     if not player_id:
         raise HTTPException(status_code=403, detail="Not authenticated")
-    
+
     data = await request.json()
-    
-    # Update the session data
-    for key, value in data.items():
-        request.session[key] = value
-    
-    # Update the connected_players if needed
-    if player_id in connected_players:
-        if 'role' in data:
-            connected_players[player_id]['session']['role'] = data['role']
-        if 'character' in data:
-            connected_players[player_id]['session']['character'] = data['character']
+
+    # Nothing is kept in the cookie; only the player record can change
+    if 'role' in data or 'character' in data:
+        room = get_room(request)
+        fields = {field: data[field] for field in ('role', 'character') if field in data}
+
+        def update(room):
+            if player_id in room.connected_players:
+                room.apply("player_update", player=player_id, **fields)
+
+        await room.call(update)
 
     return {
         "status": "success",
@@ -557,394 +1829,170 @@ async def update_session(request: Request):
     }
 
 @app.post("/api/leave-lobby")
-async def leave_lobby(request: Request):
-    player_id = request.session.get("player_id")
-    if player_id and player_id in connected_players:
-        if connected_players[player_id].get("ws"):
-            try:
-                await connected_players[player_id]["ws"].close()
-            except:
-                pass
-        del connected_players[player_id]
-        await broadcast_player_list()
-    
+async def leave_lobby(request: Request, response: Response):
+    player_id = player_of(request)
+    try:
+        room = get_room(request)
+        await room.call(lambda room: room.leave(player_id))
+    except RoomNotFound:
+        pass
+
     # Clear the session completely
-    request.session.clear()
+    response.delete_cookie(TOKEN_COOKIE)
     return {"message": "Left lobby"}
 
 @app.post("/api/reset-lobby")
-async def reset_lobby():
-    global connected_players, game_state
-    game_state = "welcome"
-    connected_players = {}
+async def reset_lobby(request: Request):
+    try:
+        room = get_room(request)
+        await room.call(lambda room: room.close(), write=False)
+    except RoomNotFound:
+        pass
     return {"message": 'Lobby reseted'}
 
 @app.get("/api/game/end")
-async def end_game():
-    global player_roles, players_tasks, sabotage_timers, game_state
-    
+async def end_game(request: Request):
     # Only allow game owner or admin to end game
-    # player_id = request.session.get("player_id")
+    # player_id = player_of(request)
     # if not player_id:
     #     raise HTTPException(status_code=403, detail="Not authenticated")
-    
-    # Reset game state
-    player_roles = None
-    players_tasks = {}
-    sabotage_timers = {}
-    votes.clear()
-    ghost_players.clear()
-    game_state = "lobby"
-
-    # Keep players connected but clear their game-specific session data
-    for pid, player in connected_players.items():
-        if "session" in player:
-            player["session"].pop("role", None)
-            player["session"].pop("character", None)
-            player["session"].pop("is_ghost", None)
-        
+
+    room = get_room(request)
+    await room.call(lambda room: room.apply("end"))
+
     return {"message": "Game ended, returning to lobby"}
 
 #───────────────────────────────────────────────────────────── emergency meetings
 @app.post("/api/emergency/call")
 async def call_emergency(request: Request):
-    global game_state
-    
-    player_id = request.session.get("player_id")
+    player_id = player_of(request)
 
     if not player_id:
         raise HTTPException(status_code=403, detail="Not authenticated")
-    
-    if game_state == "emergency":
-        raise HTTPException(status_code=400, detail="Emergency already active")
 
-    game_state = "emergency"
+    room = get_room(request)
+    def emergency(room):
+        if room.game_state == "emergency":
+            raise HTTPException(status_code=400, detail="Emergency already active")
 
-    # Broadcast emergency flash to all players
-    caller_name = connected_players[player_id]["name"]
+        room.apply("emergency", caller=player_id)
 
-    for pid, player in connected_players.items():
-        if player.get("ws"):
-            try:
-                await player["ws"].send_json({
-                    "type": "emergency_flash",
-                    "caller_name": caller_name
-                })
-            except Exception as e:
-                print(f"Error sending redirect to {pid}: {e}")
-
-    # Start countdown to redirect to vote
-    asyncio.create_task(start_voting_after(10))  # 10 seconds of flashing
+    await room.call(emergency)
 
     return {"message": "Emergency meeting called"}
 
-async def start_voting_after(seconds):
-    global game_state, votes, vote_start_time
-    
-    # Count down and broadcast to all clients
-    for i in range(seconds, 0, -1):
-        for pid, player in connected_players.items():
-            if player.get("ws"):
-                try:
-                    await player["ws"].send_json({
-                        "type": "emergency_countdown",
-                        "seconds_left": i
-                    })
-                except Exception as e:
-                    print(f"Error sending countdown to {pid}: {e}")
-        await asyncio.sleep(1)
-
-    # Initialize voting state
-    game_state = "vote"
-    votes = {}
-    vote_start_time = time.time()
-
-    # Broadcast voting start with initial time
-    for pid, player in connected_players.items():
-        if player.get("ws"):
-            try:
-                await player["ws"].send_json({
-                    "type": "vote_started",
-                    "time_left": VOTE_DURATION,
-                    "votes": votes
-                })
-            except Exception as e:
-                print(f"Error sending vote start to {pid}: {e}")
-
-    # Start background task to update time for all clients
-    asyncio.create_task(update_vote_time())
-
-async def update_vote_time():
-    global game_state, votes, vote_start_time
-    """Background task to update time remaining for all clients"""
-    while game_state == "vote":
-        time_left = max(0, VOTE_DURATION - (time.time() - vote_start_time))
-        
-        # End voting if time's up
-        if time_left <= 0:
-            await end_voting()
-            await calculate_result()
-            break
-        else:
-            # Broadcast to all connected players
-            for pid, player in connected_players.items():
-                if player.get("ws"):
-                    try:
-                        await player["ws"].send_json({
-                            "type": "vote_update",
-                            "time_left": time_left,
-                            "votes": votes
-                        })
-                    except Exception as e:
-                        print(f"Error sending time update to {pid}: {e}")
-
-            await asyncio.sleep(1)
-
-async def end_voting():
-    global game_state, alive_players
-
-    if len(alive_players) <= (2+calc_num_impostors(len(connected_players))):
-        game_state = "after_game"
-    else:
-        game_state = "game"
-
 # ────────────────────────────────────────────────────────────── report
 @app.post("/api/report")
 async def submit_report(request: Request):
-    global game_state, alive_players
+    room = get_room(request)
     data = await request.json()
     reported_id = data.get("reportedPlayerId")
-    
-    # Store the report
-    ghost_players.append(reported_id)
-    connected_players[reported_id]["session"]["is_ghost"] = True
-    alive_players.remove(reported_id)
-    game_state = "vote"
 
+    def report(room):
+        # Two players finding the same body: only the first report counts
+        if not room.is_alive(reported_id):
+            raise HTTPException(status_code=400, detail="Player is not alive")
 
-    if len(alive_players) <= (2+calc_num_impostors(len(connected_players))):
-        await send_results()
-        return
-        # await end_game()
+        if room.apply("report", player=reported_id):
+            return {"message": "Report received"}
 
-    # Notify all players about the report
-    for pid, player in connected_players.items():
-        if player.get("ws"):
-            try:
-                await player["ws"].send_json({
-                    "type": "report",
-                    "name": connected_players[reported_id]["session"]["name"],
-                    "character": connected_players[reported_id]["session"]["character"],
-                })
-            except Exception as e:
-                print(f"Error sending report to {pid}: {e}")
-    
-    asyncio.create_task(start_voting_after(10))  # 10 seconds of flashing
-    
-    return {"message": "Report received"}
+    return await room.call(report)
 
 @app.post('/api/vote')
 async def submit_vote(request: Request):
-    global game_state, votes
-
-    if game_state != "vote":
-        raise HTTPException(status_code=400, detail="Not in voting phase")
-
+    room = get_room(request)
     data = await request.json()
     voter_id = data.get("voterId")  # Should come from session or client
     target_id = data.get("targetId")
 
-    if not voter_id:
-        raise HTTPException(status_code=400, detail="Invalid vote")
+    def vote(room):
+        if room.game_state != "vote":
+            raise HTTPException(status_code=400, detail="Not in voting phase")
 
-    # Record the vote (overwrites if same voter votes again)
-    votes[voter_id] = target_id
-
-    if len(votes) == len(alive_players):
-       await calculate_result()
-       return 
-
-    # Broadcast updated votes to all clients
-    for pid, player in connected_players.items():
-        if player.get("ws"):
-            try:
-                await player["ws"].send_json({
-                    "type": "vote_update",
-                    "time_left": max(0, VOTE_DURATION - (time.time() - vote_start_time)),
-                    "votes": votes
-                })
-            except Exception as e:
-                print(f"Error sending vote update to {pid}: {e}")
-
-
-    return {"message": "Vote submitted", "votes": votes}
-
-async def calculate_result():
-    global alive_players, ghost_players, connected_players
-    
-    results = process_votes(votes, alive_players)
-    
-    # Handle case where someone was ejected
-    if results:
-        alive_players.remove(results)
-        ghost_players.append(results)
-        connected_players[results]["session"]["is_ghost"] = True
-
-        print(len(alive_players))
-        print(2+calc_num_impostors(len(connected_players)))
-        print("imp count:", len(get_impostors_ids()))
-
-        # Check if game should end
-        if len(alive_players) <= (2+calc_num_impostors(len(connected_players))) or (connected_players[results]["session"]['role'] == "Impostor" and len(get_impostors_ids()) == 0):
-            print("som tuna :(")
-            await send_results()
-            return 
-        
-        # Send ejection results to all players
-        for pid, player in connected_players.items():
-            if player.get("ws"):
-                try:
-                    await player["ws"].send_json({
-                        "type": "results",
-                        "ejected": {
-                            "name": connected_players[results]['name'],
-                            'character': connected_players[results]['session']['character'],
-                            'role': connected_players[results]['session']['role'],
-                        }
-                    })
-                except Exception as e:
-                    print(f"Error sending vote update to {pid}: {e}")
-    
-    # Handle case where no one was ejected
-    else:        
-        for pid, player in connected_players.items():
-            if player.get("ws"):
-                try:
-                    await player["ws"].send_json({
-                        "type": "results",
-                        "ejected": None  # Explicitly indicate no ejection
-                    })
-                except Exception as e:
-                    print(f"Error sending vote update to {pid}: {e}")
-    
-    await end_voting()
-
-def get_impostors_ids():
-    global connected_players
-    # Find all impostor IDs
-    impostor_ids = [
-        pid for pid, pdata in connected_players.items()
-        if pdata["session"]["role"] == "Impostor" and pdata["session"]["is_ghost"] == False
-    ]
-    return impostor_ids
+        # Ghosts don't vote; the last alive vote resolves the round
+        if not voter_id or not room.is_alive(voter_id):
+            raise HTTPException(status_code=400, detail="Invalid vote")
 
-@app.get("/api/results")
-async def get_results():
-    global connected_players, alive_players, game_state
+        if room.apply("vote", voter=voter_id, target=target_id):
+            return
 
-    pg = await get_global_progress()
+        return {"message": "Vote submitted", "votes": room.votes}
 
-    impostor_ids = get_impostors_ids()
+    return await room.call(vote)
 
-    if pg == 100:
-        winner = "Crew"
-    else:
-        if any(pid in alive_players for pid in impostor_ids):
-            winner = "Impostor"
-        else:
-            winner = "Crew"
+@app.get("/api/results")
+async def get_results(request: Request):
+    room = get_room(request)
 
     # game_state = 'lobby'  # if needed, uncomment
 
-    return {"winner": winner}
-
-async def send_results():
-    global connected_players, alive_players, game_state
-
-    pg = await get_global_progress()
-
-    impostor_ids = get_impostors_ids()
-
-    if pg == 100:
-        winner = "Crew"
-    else:
-        if any(pid in alive_players for pid in impostor_ids):
-            winner = "Impostor"
-        else:
-            winner = "Crew"
-
-    print(winner)
-    game_state = 'aftergame'
-
-    for pid, player in connected_players.items():
-        if player.get("ws"):
-            try:
-                await player["ws"].send_json({
-                    "type": "game_end",
-                    'winner': winner,
-                })
-            except Exception as e:
-                print(f"Error sending vote update to {pid}: {e}")
-
-    # await end_game()
-
-def process_votes(votes, alive_players):
-    """
-    votes: dict {voter_id: target_id or None}
-    alive_players: list of player_ids that are still alive
-    
-    Returns:
-    - player_id if someone is ejected
-    - None if no one is ejected (tie, insufficient votes, or majority skipped)
-    """
-    # Only process if all alive players have voted
-    if len(votes) < len(alive_players):
-        return None  # Not all votes in yet
-
-    # Count skip votes
-    skip_votes = sum(1 for target in votes.values() if target is None)
-    
-    # If majority skipped (half or more), no one gets ejected
-    if skip_votes >= len(alive_players) / 2:
-        return None
-
-    # Count votes per target (excluding skip votes)
-    vote_count = {}
-    for voter, target in votes.items():
-        if target is not None:  # skip "skip vote"
-            vote_count[target] = vote_count.get(target, 0) + 1
-
-    # Find max votes received
-    max_votes = max(vote_count.values()) if vote_count else 0
-    # Players with the most votes
-    top_targets = [pid for pid, count in vote_count.items() if count == max_votes]
-
-    # Majority rule: must have > half of NON-SKIP votes to eject
-    required_majority = (len(alive_players) - skip_votes) / 2
-    if max_votes > required_majority:
-        if len(top_targets) == 1:
-            return top_targets[0]  # Clear winner
-        return None  # Tie - no ejection
-    
-    return None  # No majority reached
+    return await room.call(lambda room: {"winner": room.winner()}, write=False)
 
 @app.get('/api/votes')
-async def get_votes():
-    global game_state, votes, vote_start_time
-    time_left = max(0, VOTE_DURATION - (time.time() - vote_start_time)) if game_state == "vote" else 0
-    return {
-        "votes": votes,
-        "time_left": time_left,
-        "game_state": game_state
-    }
+async def get_votes(request: Request):
+    room = get_room(request)
+    return await room.call(lambda room: {
+        "votes": room.votes,
+        "time_left": room.vote_time_left(),
+        "deadline": room.vote_deadline() if room.voting_open() else None,
+        "game_state": room.game_state
+    }, write=False)
+
+# ────────────────────────────────────────────────────────────── assets
+@app.get("/api/assets")
+async def get_asset_manifest(request: Request):
+    # Small and revalidated on every load; the files it points to never change
+    headers = {"ETag": ASSETS.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), ASSETS.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(ASSETS.manifest_body, media_type="application/json", headers=headers)
+
+@app.get("/api/assets/{file:path}")
+async def get_asset(file: str, request: Request):
+    asset = ASSETS.files.get(file)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Unknown asset")
+    encoding, body = asset.negotiate(request.headers.get("accept-encoding"))
+    headers = {"ETag": asset.etag(encoding), "Cache-Control": IMMUTABLE}
+    if asset.variants:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=asset.media_type, headers=headers)
+
+def require_local(request: Request):
+    # Meant for a scraper or an operator on the same host, not for players
+    if not METRICS_PUBLIC and (not request.client or request.client.host not in ("127.0.0.1", "::1")):
+        raise HTTPException(status_code=403, detail="Metrics are local only")
+
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    require_local(request)
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profile")
+async def get_profile(request: Request, seconds: float = 60):
+    """Folded stacks of the last ``seconds``; feed them to flamegraph.pl or speedscope."""
+    require_local(request)
+    if profiler.active is None:
+        raise HTTPException(status_code=404, detail="Profiler is off, start the server with PROFILE=1")
+    return Response(profiler.active.dump(seconds), media_type="text/plain")
 
 if __name__ == "__main__":
+    if WORKERS > 1 and STATE_STORE == "memory":
+        # Workers only see each other's rooms through a shared store
+        os.environ["STATE_STORE"] = "sqlite"
+
     uvicorn.run(
-        "server:app", 
-        host="0.0.0.0", 
+        "server:app",
+        host="0.0.0.0",
         port=8000,
         ws_ping_interval=20,
         ws_ping_timeout=20,
         log_level="info",
-        workers=6
-    )
\ No newline at end of file
+        # The profiler wraps the handles of the pure Python loop, uvloop has none
+        loop="asyncio" if PROFILE else "auto",
+        workers=WORKERS
+    )
@@ -0,0 +1,191 @@
+"""Room state stores and the cross-worker event channel.
+
+``MemoryStore``/``MemoryChannel`` keep everything inside one process, which is
+all a single uvicorn worker needs. ``SQLiteStore``/``SQLiteChannel`` share room
+state and broadcast envelopes through a local SQLite file, so several workers
+can serve the same rooms without any external service.
+
+The stores are synchronous on purpose: room mutations never await, so a
+transaction is a short critical section and holding the SQLite write lock for
+its duration is cheap.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+CHANNEL_POLL_INTERVAL = 0.02    # seconds between polls of the shared event table
+CHANNEL_RETENTION = 60          # seconds before delivered events are purged
+
+
+class RoomNotFound(Exception):
+    """The room code is unknown to the store (never created or already deleted)."""
+
+
+class Record:
+    """Version and serialized state of one room inside a transaction."""
+
+    __slots__ = ("version", "state", "dirty")
+
+    def __init__(self, version, state):
+        self.version = version
+        self.state = state
+        self.dirty = False
+
+    def save(self, state):
+        self.version += 1
+        self.state = state
+        self.dirty = True
+
+
+class MemoryStore:
+    """Process-local store: the cached GameRoom objects are the state."""
+
+    keeps_state = False
+
+    def __init__(self):
+        self.versions = {}
+
+    def create(self, code) -> bool:
+        if code in self.versions:
+            return False
+        self.versions[code] = 0
+        return True
+
+    def delete(self, code):
+        self.versions.pop(code, None)
+
+    @contextmanager
+    def transaction(self, code):
+        if code not in self.versions:
+            raise RoomNotFound(code)
+        record = Record(self.versions[code], None)
+        yield record
+        # A room deleted in the transaction (its last player left) stays deleted
+        if record.dirty and code in self.versions:
+            self.versions[code] = record.version
+
+
+class SQLiteStore:
+    """Rooms serialized as JSON rows; ``BEGIN IMMEDIATE`` serializes writers across workers."""
+
+    keeps_state = True
+
+    def __init__(self, path):
+        self.db = connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS rooms (code TEXT PRIMARY KEY, version INTEGER NOT NULL, state TEXT)"
+        )
+
+    def create(self, code) -> bool:
+        cursor = self.db.execute("INSERT OR IGNORE INTO rooms (code, version, state) VALUES (?, 0, NULL)", (code,))
+        return cursor.rowcount == 1
+
+    def delete(self, code):
+        self.db.execute("DELETE FROM rooms WHERE code = ?", (code,))
+
+    @contextmanager
+    def transaction(self, code):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT version, state FROM rooms WHERE code = ?", (code,)).fetchone()
+            if row is None:
+                raise RoomNotFound(code)
+            record = Record(row[0], json.loads(row[1]) if row[1] else None)
+            yield record
+            if record.dirty:
+                self.db.execute(
+                    "UPDATE rooms SET version = ?, state = ? WHERE code = ?",
+                    (record.version, json.dumps(record.state), code),
+                )
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+
+class MemoryChannel:
+    """Delivers envelopes straight to this worker's sockets.
+
+    Both channels hand envelopes to ``deliver``, which the server sets.
+    """
+
+    def __init__(self):
+        self.deliver = None
+
+    def publish(self, envelope):
+        self.deliver(envelope)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class SQLiteChannel:
+    """Fan-out of broadcast envelopes to every worker through an append-only table.
+
+    Envelopes are delivered locally right away; other workers pick them up on
+    their next poll and skip the ones they published themselves.
+    """
+
+    def __init__(self, path):
+        self.db = connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, origin INTEGER NOT NULL, "
+            "created REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        self.origin = os.getpid()
+        self.deliver = None
+        self.poller = None
+
+    def publish(self, envelope):
+        self.db.execute(
+            "INSERT INTO events (origin, created, payload) VALUES (?, ?, ?)",
+            (self.origin, time.time(), json.dumps(envelope)),
+        )
+        self.deliver(envelope)
+
+    async def start(self):
+        row = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()
+        self.poller = asyncio.create_task(self.poll(row[0]))
+
+    async def stop(self):
+        if self.poller:
+            self.poller.cancel()
+
+    async def poll(self, last_id):
+        last_purge = time.time()
+        while True:
+            await asyncio.sleep(CHANNEL_POLL_INTERVAL)
+            rows = self.db.execute(
+                "SELECT id, origin, payload FROM events WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+            for event_id, origin, payload in rows:
+                last_id = event_id
+                if origin != self.origin:
+                    self.deliver(json.loads(payload))
+
+            now = time.time()
+            if now - last_purge > CHANNEL_RETENTION:
+                self.db.execute("DELETE FROM events WHERE created < ?", (now - CHANNEL_RETENTION,))
+                last_purge = now
+
+
+def connect(path):
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def create_backend(kind, path):
+    """Store and channel pair for ``kind`` ("memory" or "sqlite")."""
+    if kind == "sqlite":
+        return SQLiteStore(path), SQLiteChannel(path)
+    if kind == "memory":
+        return MemoryStore(), MemoryChannel()
+    raise ValueError(f"Unknown state store: {kind}")
@@ -0,0 +1,65 @@
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+# The backend modules are imported by name, as server.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# No event logs or chatter from the server these tests import; restore tests point it at tmp_path
+os.environ["EVENT_LOG_DIR"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["STATE_STORE"] = "memory"
+
+
+class Player:
+    """One player's cookies on the shared TestClient."""
+
+    def __init__(self, client, name, room=None):
+        self.client = client
+        self.cookies = {}
+        body = self.post("/api/join", json={"name": name, "room": room}).json()
+        self.id = body["playerId"]
+        self.room = body["room"]
+
+    def request(self, method, url, **kwargs):
+        self.client.cookies = self.cookies
+        response = self.client.request(method, url, **kwargs)
+        self.cookies = dict(self.client.cookies)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    @contextmanager
+    def ws(self, **auth):
+        """Socket authenticated as this player; ``auth`` adds fields such as ``last_seq``."""
+        self.client.cookies = self.cookies
+        with self.client.websocket_connect("/ws") as socket:
+            socket.send_json({"type": "auth", "player_id": self.id, "room": self.room, **auth})
+            yield socket
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import server
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def lobby(client):
+    """``lobby(n)``: n players joined to one new room, the first one its starter."""
+    def join(count):
+        players = [Player(client, "p0")]
+        players += [Player(client, f"p{i}", players[0].room) for i in range(1, count)]
+        return players
+    return join
+
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from store import RoomNotFound
+
+
+def run(test):
+    """Run ``test(room)`` on a fresh event loop with a new room."""
+    async def main():
+        room = server.create_room()
+        try:
+            return await test(room)
+        finally:
+            room.clock.stop()
+            server.rooms.pop(room.code, None)
+            server.store.delete(room.code)
+    return asyncio.run(main())
+
+
+def test_commands_run_in_arrival_order():
+    async def test(room):
+        seen = []
+
+        def command(i):
+            def apply(room):
+                seen.append(i)
+                return i
+            return apply
+
+        results = await asyncio.gather(*(room.call(command(i)) for i in range(50)))
+        assert results == list(range(50))
+        assert seen == list(range(50))
+    run(test)
+
+
+def test_actor_yields_between_commands():
+    async def test(room):
+        other = server.create_room()
+        order = []
+        first = [room.call(lambda room, i=i: order.append(("a", i))) for i in range(3)]
+        second = [other.call(lambda room, i=i: order.append(("b", i))) for i in range(3)]
+        await asyncio.gather(*first, *second)
+        # One room's backlog does not hold up another room
+        assert order == [("a", 0), ("b", 0), ("a", 1), ("b", 1), ("a", 2), ("b", 2)]
+        other.clock.stop()
+        server.rooms.pop(other.code, None)
+        server.store.delete(other.code)
+    run(test)
+
+
+def test_errors_reach_the_caller_and_the_actor_goes_on():
+    async def test(room):
+        def fail(room):
+            room.broadcast({"type": "never_sent"})
+            raise HTTPException(status_code=400, detail="nope")
+
+        with pytest.raises(HTTPException):
+            await room.call(fail)
+        # The failed command's messages were dropped with its transaction
+        assert room.outbox == []
+        assert await room.call(lambda room: room.code) == room.code
+    run(test)
+
+
+def test_posted_failures_do_not_stop_the_actor():
+    async def test(room):
+        # Timers have nobody to raise to; the failure is logged
+        room.post(lambda room: 1 / 0)
+        assert await room.call(lambda room: "after") == "after"
+    run(test)
+
+
+def test_closed_room_raises_room_not_found():
+    async def test(room):
+        room.clock.schedule("sabotage", 60, lambda: None)
+        await room.call(lambda room: room.close())
+        assert room.code not in server.rooms
+        with pytest.raises(RoomNotFound):
+            await room.call(lambda room: None)
+        assert not room.clock.pending("sabotage")
+    run(test)
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from clock import GameClock
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def manual_clock(on_tick=None):
+    fake = FakeTime()
+    return GameClock(on_tick, time_fn=fake, autorun=False), fake
+
+
+def test_fires_in_deadline_order():
+    clock, fake = manual_clock()
+    fired = []
+    clock.schedule("late", 3, lambda: fired.append("late"))
+    clock.schedule("early", 1, lambda: fired.append("early"))
+    clock.schedule("mid", 2, lambda: fired.append("mid"))
+    assert clock.advance(0.5) == 0.5
+    fake.now = 5
+    assert clock.advance() is None
+    assert fired == ["early", "mid", "late"]
+
+
+def test_same_deadline_fires_in_schedule_order():
+    clock, _ = manual_clock()
+    fired = []
+    for name in "abc":
+        clock.schedule(name, 1, lambda name=name: fired.append(name))
+    clock.advance(1)
+    assert fired == ["a", "b", "c"]
+
+
+def test_reschedule_supersedes():
+    clock, fake = manual_clock()
+    fired = []
+    clock.schedule("vote", 1, lambda: fired.append("first"))
+    clock.schedule("vote", 2, lambda: fired.append("second"))
+    assert clock.advance(1.5) == 0.5
+    clock.advance(2)
+    assert fired == ["second"]
+
+
+def test_cancel():
+    clock, _ = manual_clock()
+    fired = []
+    clock.schedule("sabotage", 1, lambda: fired.append("sabotage"))
+    clock.cancel("sabotage")
+    assert not clock.pending("sabotage")
+    assert clock.advance(2) is None
+    assert fired == []
+
+
+def test_failing_timer_does_not_stop_the_rest():
+    clock, _ = manual_clock()
+    fired = []
+    clock.schedule("broken", 1, lambda: 1 / 0)
+    clock.schedule("after", 1, lambda: fired.append("after"))
+    clock.advance(1)
+    assert fired == ["after"]
+
+
+def test_ticks_once_per_second():
+    ticks = []
+    clock, _ = manual_clock(ticks.append)
+    clock.schedule("countdown", 3, lambda: None, tick=True)
+    for now in (0, 0.5, 1, 2.2):
+        clock.advance(now)
+    assert ticks == [{"countdown": 3}, {"countdown": 2}, {"countdown": pytest.approx(0.8)}]
+
+
+def test_runner_fires_on_time():
+    async def main():
+        fired = asyncio.Event()
+        clock = GameClock()
+        clock.schedule("countdown", 0.01, fired.set)
+        await asyncio.wait_for(fired.wait(), 1)
+        clock.stop()
+
+    asyncio.run(main())
+
+
+def test_stop_cancels_runner_woken_in_the_same_step():
+    async def main():
+        clock = GameClock()
+        clock.schedule("a", 5, lambda: None)
+        await asyncio.sleep(0.01)
+        # The wakeup and the cancel reach the waiting runner together
+        clock.schedule("b", 3, lambda: None)
+        runner = clock.runner
+        clock.stop()
+        await asyncio.wait([runner], timeout=1)
+        assert runner.cancelled()
+
+    asyncio.run(main())
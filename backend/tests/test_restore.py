@@ -0,0 +1,112 @@
+import os
+import time
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def event_logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "EVENT_LOG_DIR", str(tmp_path))
+    return tmp_path
+
+
+def restart(client, room):
+    """What a crash leaves to the next process: the flushed log, nothing in memory."""
+    def crash():
+        room.log.flush()
+        room.clock.stop()
+        server.rooms.pop(room.code)
+        server.store.delete(room.code)
+        server.restore_games()
+
+    client.portal.call(crash)
+    return server.rooms[room.code]
+
+
+def play(players):
+    """Start a game, finish a task each and sabotage; returns the room."""
+    players[0].post("/api/start")
+    room = server.rooms[players[0].room]
+    for player in players:
+        task = player.get("/api/tasks").json()["tasks"][0]
+        player.post("/api/update-task", json={"playerId": player.id, "taskId": task["id"], "done": True})
+    impostor = next(p for p in players if room.is_impostor(p.id))
+    assert impostor.post("/api/sabotage").status_code == 200
+    return room
+
+
+def test_restore_during_the_report_countdown(client, lobby, event_logs):
+    players = lobby(6)
+    room = play(players)
+    victim = next(p for p in players if not room.is_impostor(p.id))
+    players[0].post("/api/report", json={"reportedPlayerId": victim.id})
+    before = room.to_state()
+
+    restored = restart(client, room)
+    assert restored is not room
+    for field in ("uid", "game_state", "member_mask", "alive_mask", "ghost_mask", "impostor_mask",
+                  "crew_done", "crew_total", "progress", "sabotage_active", "events"):
+        assert getattr(restored, field) == before[field], field
+    assert restored.calc_global_progress() == room.calc_global_progress()
+    assert not restored.is_alive(victim.id)
+    assert [p.socket for p in restored.connected_players.values()] == [None] * 6
+    # The countdown starts over, the sabotage keeps its deadline
+    assert restored.clock.pending("meeting") and not restored.clock.pending("vote")
+    assert restored.clock.remaining("sabotage") == pytest.approx(before["sabotage_ends_at"] - time.time(), abs=1)
+
+    votes = players[0].get("/api/votes")
+    assert votes.status_code == 200
+    assert votes.json() == {"votes": {}, "time_left": 0, "deadline": None, "game_state": "vote"}
+
+
+def test_restore_during_a_vote_keeps_its_deadline(client, lobby, event_logs):
+    players = lobby(6)
+    room = play(players)
+    client.portal.call(room.call, lambda room: room.start_voting())
+    players[1].post("/api/vote", json={"voterId": players[1].id, "targetId": None})
+    deadline = room.vote_deadline()
+
+    restored = restart(client, room)
+    assert restored.votes == {players[1].id: None}
+    assert restored.clock.remaining("vote") == pytest.approx(deadline - time.time(), abs=1)
+    votes = players[0].get("/api/votes").json()
+    assert votes["deadline"] == deadline
+    assert 0 < votes["time_left"] <= server.VOTE_DURATION
+
+
+def test_finished_and_abandoned_logs_are_not_restored(client, lobby, event_logs, monkeypatch):
+    ended = lobby(3)
+    for player in ended:
+        player.post("/api/leave-lobby")
+    abandoned = lobby(3)
+    room = server.rooms[abandoned[0].room]
+    client.portal.call(room.log.flush)
+    old = time.time() - 2 * server.ROOM_IDLE_TIMEOUT
+    os.utime(room.log.path, (old, old))
+    client.portal.call(room.clock.stop)
+    server.rooms.pop(room.code)
+    server.store.delete(room.code)
+
+    client.portal.call(server.restore_games)
+    assert room.code not in server.rooms
+    assert ended[0].room not in server.rooms
+    assert sorted(path.name.endswith(".closed.jsonl") for path in event_logs.glob("*.jsonl")) == [True, True]
+
+
+def test_restored_roster_never_matches_a_cached_etag(client, lobby, event_logs):
+    players = lobby(3)
+    room = server.rooms[players[0].room]
+    etags = [players[0].get("/api/players").headers["etag"]]
+    # Presence moves the roster version, but is not in the log
+    for player in players:
+        with player.ws() as socket:
+            socket.receive_json()
+        etags.append(players[0].get("/api/players").headers["etag"])
+
+    restart(client, room)
+    response = players[0].get("/api/players")
+    assert response.headers["etag"] not in etags
+    for etag in etags:
+        assert players[0].get("/api/players", headers={"if-none-match": etag}).status_code == 200
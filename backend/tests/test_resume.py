@@ -0,0 +1,65 @@
+import server
+
+
+def receive_types(socket, count):
+    return [socket.receive_json()["type"] for _ in range(count)]
+
+
+def test_fresh_socket_gets_a_snapshot(lobby):
+    player = lobby(2)[0]
+    with player.ws() as socket:
+        assert receive_types(socket, 2) == ["players_update", "snapshot"]
+
+
+def test_reconnect_resumes_after_last_seq(lobby):
+    starter, other, leaver = lobby(3)
+    with starter.ws() as socket:
+        socket.receive_json()
+        last_seq = socket.receive_json()["seq"]
+    starter.post("/api/start")
+    leaver.post("/api/leave-lobby")
+
+    with starter.ws(last_seq=last_seq) as socket:
+        resume = socket.receive_json()
+    assert resume["type"] == "resume"
+    seqs = [event["seq"] for event in resume["events"]]
+    assert seqs and seqs[0] > last_seq and seqs == sorted(seqs)
+    assert "game_start" in [event["type"] for event in resume["events"]]
+
+    # Caught up: only the roster changes of that socket going online and away again
+    with starter.ws(last_seq=seqs[-1]) as socket:
+        resume = socket.receive_json()
+    assert resume["type"] == "resume"
+    assert {event["type"] for event in resume["events"]} <= {"players_update"}
+
+
+def test_personal_messages_only_resume_to_their_player(lobby):
+    starter, other = lobby(2)
+    with other.ws() as socket:
+        socket.receive_json()
+        last_seq = socket.receive_json()["seq"]
+    starter.post("/api/start")
+    room = server.rooms[starter.room]
+    personal = [e for e in room.history if e.get("to") and e["seq"] > last_seq]
+    assert personal
+
+    with other.ws(last_seq=last_seq) as socket:
+        events = socket.receive_json()["events"]
+    resumed = {event["seq"] for event in events}
+    for envelope in personal:
+        assert (envelope["seq"] in resumed) == (envelope["to"] == other.id)
+
+
+def test_gap_outside_the_buffer_falls_back_to_a_snapshot(lobby):
+    player = lobby(3)[0]
+    player.post("/api/start")
+    server.rooms[player.room].history.clear()
+    with player.ws(last_seq=1) as socket:
+        assert receive_types(socket, 2) == ["players_update", "snapshot"]
+
+
+def test_seq_from_the_future_falls_back_to_a_snapshot(lobby):
+    # A last_seq from another room (or an older server) must not be trusted
+    player = lobby(2)[0]
+    with player.ws(last_seq=10_000) as socket:
+        assert receive_types(socket, 2) == ["players_update", "snapshot"]
@@ -0,0 +1,66 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import server
+
+
+def test_latest_state_is_coalesced_and_events_queue_in_order():
+    hub = server.SpectatorHub(server.GameRoom("ZZZZ"))
+    hub.offer({"type": "global_progress", "globalProgress": 10})
+    hub.offer({"type": "emergency_flash", "caller_name": "p0"})
+    hub.offer({"type": "global_progress", "globalProgress": 20})
+    hub.offer({"type": "task_update", "tasks": []})     # personal, never shown
+    hub.offer({"type": "report", "name": "p1"})
+    assert list(hub.pending.values()) == [
+        {"type": "emergency_flash", "caller_name": "p0"},
+        {"type": "global_progress", "globalProgress": 20},
+        {"type": "report", "name": "p1"},
+    ]
+
+
+def test_spectators_see_no_player_ids():
+    room = server.GameRoom("ZZZZ")
+    room.add_player("00000000-0000-0000-0000-000000000001", "p0")
+    hub = room.spectators
+    roster = hub.view(room.players_update())
+    assert roster["players"] and all("id" not in p for p in roster["players"])
+    cast = hub.view({"type": "vote_cast", "voter": "00000000-0000-0000-0000-000000000001", "target": None})
+    assert cast == {"type": "vote_cast", "voter": "p0"}
+
+
+def test_spectator_stream(client, lobby, monkeypatch):
+    monkeypatch.setattr(server, "SPECTATOR_FPS", 50)
+    players = lobby(4)
+    room = server.rooms[players[0].room]
+    with client.websocket_connect("/ws") as first, client.websocket_connect("/ws") as second:
+        first.send_json({"type": "spectate", "room": room.code.lower()})
+        second.send_json({"type": "spectate", "room": room.code})
+        snapshots = [first.receive_json(), second.receive_json()]
+        assert [s["type"] for s in snapshots] == ["spectator_snapshot"] * 2
+        assert all("id" not in p for p in snapshots[0]["players"])
+        assert len(room.spectators.viewers) == 2
+        # Spectators are not players
+        assert len(room.connected_players) == 4
+
+        players[0].post("/api/start")
+        players[0].post("/api/gamestate", json={"state": "game"})
+        players[1].post("/api/emergency/call")
+        for socket in (first, second):
+            seen = []
+            while "emergency_flash" not in seen:
+                frame = socket.receive_json()
+                assert frame["type"] == "spectator_frame"
+                seen += [event["type"] for event in frame["events"]]
+            assert "game_state" in seen
+
+        first.send_json({"type": "ping"})
+        while first.receive_json()["type"] != "pong":
+            pass
+
+
+def test_spectating_an_unknown_room_is_refused(client):
+    with client.websocket_connect("/ws") as socket:
+        socket.send_json({"type": "spectate", "room": "0000"})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            socket.receive_json()
+    assert closed.value.code == 1008
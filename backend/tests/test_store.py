@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+
+import pytest
+
+import server
+from store import MemoryStore, RoomNotFound, SQLiteChannel, SQLiteStore
+
+
+def test_memory_store_codes():
+    store = MemoryStore()
+    assert store.create("ABCD")
+    assert not store.create("ABCD")
+    with store.transaction("ABCD") as record:
+        record.save(None)
+    assert store.versions["ABCD"] == 1
+    with pytest.raises(RoomNotFound):
+        with store.transaction("WXYZ"):
+            pass
+
+
+def test_memory_store_room_deleted_in_its_transaction_stays_deleted():
+    store = MemoryStore()
+    store.create("ABCD")
+    with store.transaction("ABCD") as record:
+        store.delete("ABCD")
+        record.save(None)
+    assert store.create("ABCD")
+
+
+def test_sqlite_store_shares_state_between_workers(tmp_path):
+    path = tmp_path / "state.db"
+    first, second = SQLiteStore(path), SQLiteStore(path)
+    assert first.create("ABCD")
+    assert not second.create("ABCD")
+    with first.transaction("ABCD") as record:
+        record.save({"game_state": "game"})
+    with second.transaction("ABCD") as record:
+        assert (record.version, record.state) == (1, {"game_state": "game"})
+
+
+def test_sqlite_store_rolls_back_a_failed_transaction(tmp_path):
+    store = SQLiteStore(tmp_path / "state.db")
+    store.create("ABCD")
+    with pytest.raises(ValueError):
+        with store.transaction("ABCD") as record:
+            record.save({"game_state": "game"})
+            raise ValueError
+    with store.transaction("ABCD") as record:
+        assert (record.version, record.state) == (0, None)
+    store.delete("ABCD")
+    with pytest.raises(RoomNotFound):
+        with store.transaction("ABCD"):
+            pass
+
+
+def test_sqlite_channel_fans_out_to_other_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr("store.CHANNEL_POLL_INTERVAL", 0.001)
+    path = tmp_path / "state.db"
+
+    async def main():
+        local, remote = SQLiteChannel(path), SQLiteChannel(path)
+        remote.origin += 1      # another worker
+        delivered = {"local": [], "remote": []}
+        local.deliver = delivered["local"].append
+        remote.deliver = delivered["remote"].append
+        await local.start()
+        await remote.start()
+        try:
+            local.publish({"room": "ABCD", "message": {"type": "hello"}})
+            # Right away to this worker's sockets, on the next poll to the others
+            assert len(delivered["local"]) == 1
+            for _ in range(100):
+                if delivered["remote"]:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.02)
+        finally:
+            await local.stop()
+            await remote.stop()
+        return delivered
+
+    delivered = asyncio.run(main())
+    assert delivered["remote"] == [{"room": "ABCD", "message": {"type": "hello"}}]
+    # A worker skips its own envelopes when it polls them back
+    assert len(delivered["local"]) == 1
+
+
+def test_rooms_of_two_workers_see_each_others_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "store", SQLiteStore(tmp_path / "state.db"))
+    server.store.create("ABCD")
+    # One GameRoom per worker for the same code, each with its own copy of the state
+    first, second = server.GameRoom("ABCD"), server.GameRoom("ABCD")
+    player_id = str(uuid.uuid4())
+    try:
+        first.execute(lambda room: room.apply("join", player=player_id, name="p0"), reraise=True)
+        assert second.execute(lambda room: list(room.connected_players), write=False, reraise=True) == [player_id]
+        second.execute(lambda room: room.apply("player_update", player=player_id, name="renamed"), reraise=True)
+        assert first.execute(lambda room: room.connected_players[player_id].name, reraise=True) == "renamed"
+        assert first.roster_version == second.roster_version
+    finally:
+        server.rooms.pop("ABCD", None)
@@ -0,0 +1,40 @@
+import time
+import uuid
+
+from tokens import TokenSigner
+
+PLAYER = str(uuid.uuid4())
+
+
+def test_round_trip():
+    signer = TokenSigner("secret", ttl=60)
+    assert signer.verify(signer.issue(PLAYER, "ABCD")) == (PLAYER, "ABCD")
+
+
+def test_expired(monkeypatch):
+    signer = TokenSigner("secret", ttl=60)
+    token = signer.issue(PLAYER, "ABCD")
+    monkeypatch.setattr(time, "time", lambda: int(token.split(".")[2], 16) + 1)
+    assert signer.verify(token) is None
+
+
+def test_tampered_payload():
+    signer = TokenSigner("secret", ttl=60)
+    room, player, expires, signature = signer.issue(PLAYER, "ABCD").split(".")
+    assert signer.verify(f"WXYZ.{player}.{expires}.{signature}") is None
+    # Pushing the expiry out needs a new signature too
+    assert signer.verify(f"{room}.{player}.{int(expires, 16) + 3600:x}.{signature}") is None
+
+
+def test_other_secret():
+    token = TokenSigner("secret", ttl=60).issue(PLAYER, "ABCD")
+    assert TokenSigner("other", ttl=60).verify(token) is None
+
+
+def test_malformed():
+    signer = TokenSigner("secret", ttl=60)
+    for token in ("", "garbage", "a.b.c.d.e", f"ABCD.{signer.sign('ABCD')}"):
+        assert signer.verify(token) is None
+    # Validly signed, but the player part is no uuid
+    payload = "ABCD.bm90LWEtdXVpZA.ffffffff"
+    assert signer.verify(f"{payload}.{signer.sign(payload)}") is None
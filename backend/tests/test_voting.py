@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+import voting
+
+
+def process_votes(votes, alive_players):
+    """The inline rules voting.py replaced, kept as the reference."""
+    if len(votes) < len(alive_players):
+        return None
+    skip_votes = sum(1 for target in votes.values() if target is None)
+    if skip_votes >= len(alive_players) / 2:
+        return None
+    vote_count = {}
+    for target in votes.values():
+        if target is not None:
+            vote_count[target] = vote_count.get(target, 0) + 1
+    max_votes = max(vote_count.values()) if vote_count else 0
+    top_targets = [pid for pid, count in vote_count.items() if count == max_votes]
+    if max_votes > (len(alive_players) - skip_votes) / 2 and len(top_targets) == 1:
+        return top_targets[0]
+    return None
+
+
+def random_meetings(count, seed=7):
+    """(votes by voter index, number alive) with skips, ties and missing voters."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        alive = rng.randint(1, 10)
+        voters = rng.sample(range(alive), rng.randint(max(0, alive - 2), alive))
+        yield {v: rng.choice([None, *range(rng.randint(1, alive))]) for v in voters}, alive
+
+
+def expected(votes, alive):
+    ejected = process_votes(votes, list(range(alive)))
+    return voting.NO_EJECTION if ejected is None else ejected
+
+
+def ballot(votes):
+    return [voting.SKIP if target is None else target for target in votes.values()]
+
+
+def test_resolve_matches_process_votes():
+    for votes, alive in random_meetings(20000):
+        assert voting.resolve(ballot(votes), alive) == expected(votes, alive), (votes, alive)
+
+
+def test_resolve_batch_matches_process_votes():
+    np = pytest.importorskip("numpy")
+    meetings = list(random_meetings(20000, seed=11))
+    ballots = np.full((len(meetings), 10), voting.ABSENT)
+    for row, (votes, _) in enumerate(meetings):
+        ballots[row, :len(votes)] = ballot(votes)
+    ejected = voting.resolve_batch(ballots, [alive for _, alive in meetings], num_targets=10)
+    assert ejected.tolist() == [expected(votes, alive) for votes, alive in meetings]
+
+
+@pytest.mark.parametrize("ballot, alive, ejected", [
+    ([0, 0, 1], 3, 0),
+    ([0, 1, voting.SKIP], 3, voting.NO_EJECTION),         # tie
+    ([0, voting.SKIP, voting.SKIP, 1], 4, voting.NO_EJECTION),   # half skipped
+    ([0, 0], 3, voting.NO_EJECTION),                      # not everyone voted
+])
+def test_resolve_rules(ballot, alive, ejected):
+    assert voting.resolve(ballot, alive) == ejected
+
+
+def test_require_all_off_counts_the_votes_in():
+    rules = voting.RULES._replace(require_all=False)
+    assert voting.resolve([0, 0], 3, rules) == 0
@@ -0,0 +1,85 @@
+"""Vote resolution over player indices, one ballot at a time or in batches.
+
+A ballot holds one entry per cast vote: the ``Player.index`` of the target,
+or ``SKIP``. ``resolve`` is what the live game uses; ``resolve_batch`` applies
+the same rules to a 2-D NumPy array of ballots (``ABSENT`` pads voters who
+did not vote in time) so millions of simulated meetings can be resolved at
+once. Both return the ejected index or ``NO_EJECTION``.
+"""
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SKIP = -1
+ABSENT = -2
+NO_EJECTION = -1
+
+
+class VoteRules(NamedTuple):
+    # Skips of at least this share of the alive players eject nobody
+    skip_majority: float = 0.5
+    # The top target needs more than this share of the alive players who did not skip
+    eject_majority: float = 0.5
+    # A vote that ended before everyone voted ejects nobody
+    require_all: bool = True
+
+
+RULES = VoteRules()
+
+
+def resolve(ballot, num_alive: int, rules: VoteRules = RULES) -> int:
+    if rules.require_all and len(ballot) < num_alive:
+        return NO_EJECTION
+
+    skips = 0
+    counts = []
+    for target in ballot:
+        if target == SKIP:
+            skips += 1
+            continue
+        if target >= len(counts):
+            counts.extend([0] * (target + 1 - len(counts)))
+        counts[target] += 1
+
+    if skips >= num_alive * rules.skip_majority or not counts:
+        return NO_EJECTION
+
+    top = max(counts)
+    if top <= (num_alive - skips) * rules.eject_majority or counts.count(top) > 1:
+        # No majority, or a tie
+        return NO_EJECTION
+    return counts.index(top)
+
+
+def resolve_batch(ballots, num_alive, rules: VoteRules = RULES, num_targets: int = None):
+    """``resolve`` for every row of ``ballots`` (games x voters); ``num_alive`` is a scalar or one per row."""
+    ballots = np.asarray(ballots)
+    games = ballots.shape[0]
+    num_alive = np.broadcast_to(np.asarray(num_alive), (games,))
+    if num_targets is None:
+        num_targets = int(ballots.max(initial=0)) + 1
+
+    skips = (ballots == SKIP).sum(axis=1)
+    cast = (ballots != ABSENT).sum(axis=1)
+
+    # Per-row tallies with one bincount over row-offset targets
+    voted = ballots >= 0
+    rows = np.broadcast_to(np.arange(games)[:, None], ballots.shape)
+    counts = np.bincount(
+        (rows * num_targets + ballots)[voted], minlength=games * num_targets
+    ).reshape(games, num_targets)
+
+    top = counts.max(axis=1)
+    leaders = (counts == top[:, None]).sum(axis=1)
+    ejected = (
+        (skips < num_alive * rules.skip_majority)
+        & (top > 0)
+        & (top > (num_alive - skips) * rules.eject_majority)
+        & (leaders == 1)
+    )
+    if rules.require_all:
+        ejected &= cast >= num_alive
+    return np.where(ejected, counts.argmax(axis=1), NO_EJECTION)
@@ -0,0 +1,80 @@
+"""Encodings for server -> client /ws frames.
+
+JSON text frames are the default and what older clients get. A client that
+lists "msgpack" in the ``formats`` of its auth message gets binary frames
+instead: a two-element array ``[type code, body]`` where the code is the
+index of the message type in ``MESSAGE_TYPES`` (sent in the welcome message)
+and the body is the rest of the message. Types missing from the table are
+sent by name. Client -> server messages stay JSON.
+"""
+import json
+from collections import OrderedDict
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Append only: codes are list positions and clients may cache the table
+MESSAGE_TYPES = (
+    "players_update", "snapshot", "resume", "role_assigned", "game_start", "task_update",
+    "global_progress", "emergency_flash", "emergency_countdown", "report", "vote_started",
+    "vote_cast", "results", "game_end", "sabotage_active", "sabotage_ended", "sabotage_ready",
+    "pong", "spectator_snapshot", "spectator_frame",
+)
+TYPE_CODES = {name: code for code, name in enumerate(MESSAGE_TYPES)}
+
+FRAME_CACHE_SIZE = 512     # memoized frames per worker
+
+JSON = "json"
+MSGPACK = "msgpack"
+FORMATS = (MSGPACK, JSON) if msgpack else (JSON,)
+
+
+def negotiate(offered) -> str:
+    """First format the client offered that this server can speak, JSON otherwise."""
+    for name in offered or ():
+        if name in FORMATS:
+            return name
+    return JSON
+
+
+def encode_json(message: dict) -> str:
+    return json.dumps(message)
+
+
+def encode_msgpack(message: dict) -> bytes:
+    body = dict(message)
+    kind = body.pop("type", None)
+    return msgpack.packb([TYPE_CODES.get(kind, kind), body])
+
+
+ENCODERS = {JSON: encode_json}
+if msgpack:
+    ENCODERS[MSGPACK] = encode_msgpack
+
+
+def encode(message: dict, fmt: str = JSON):
+    """Frame for ``message``: ``str`` for text frames, ``bytes`` for binary ones."""
+    return ENCODERS[fmt](message)
+
+
+frame_cache = OrderedDict()
+
+
+def frame(message: dict, fmt: str = JSON, key=None):
+    """``encode`` memoized on ``key``, which must identify the payload (e.g. a state version).
+
+    Messages without a key are encoded every time.
+    """
+    if key is None:
+        return ENCODERS[fmt](message)
+    cache_key = (key, fmt)
+    cached = frame_cache.get(cache_key)
+    if cached is not None:
+        frame_cache.move_to_end(cache_key)
+        return cached
+    cached = frame_cache[cache_key] = ENCODERS[fmt](message)
+    if len(frame_cache) > FRAME_CACHE_SIZE:
+        frame_cache.popitem(last=False)
+    return cached
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, useOutletContext } from 'react-router-dom';
+import { assetUrl } from '../assets.js';
 
 export default function ActionButtons({ onReportKill, timeLeft, onSabotage, cooldown, ghost }) {
   const navigate = useNavigate();
@@ -24,7 +25,7 @@ export default function ActionButtons({ onReportKill, timeLeft, onSabotage, cool
             onClick={handleEmergency}
           >
             <img
-              src="/src/assets/emg.png"
+              src={assetUrl('emg.png')}
               alt="Emergency"
               className="w-10 h-10 object-contain"
             />
@@ -37,7 +38,7 @@ export default function ActionButtons({ onReportKill, timeLeft, onSabotage, cool
             onClick={onReportKill}
           >
             <img
-              src="/src/assets/report.png"
+              src={assetUrl('report.png')}
               alt="Report Kill"
               className="w-10 h-10 object-contain"
             />
@@ -54,7 +55,7 @@ export default function ActionButtons({ onReportKill, timeLeft, onSabotage, cool
                 >
                   <div className="flex flex-col items-center">
                     <img
-                      src="/src/assets/sabotage.png"
+                      src={assetUrl('sabotage.png')}
                       alt="Sabotage"
                       className="w-8 h-8 object-contain opacity-50 mb-1"
                     />
@@ -69,7 +70,7 @@ export default function ActionButtons({ onReportKill, timeLeft, onSabotage, cool
                   onClick={onSabotage}
                 >
                   <img
-                    src="/src/assets/sabotage.png"
+                    src={assetUrl('sabotage.png')}
                     alt="Sabotage"
                     className="w-10 h-10 object-contain"
                   />
@@ -87,7 +88,7 @@ export default function ActionButtons({ onReportKill, timeLeft, onSabotage, cool
         onClick={handleShowMap}
       >
         <img
-          src="/src/assets/map.png"
+          src={assetUrl('map.png')}
           alt="Map"
           className="w-10 h-10 object-contain"
         />
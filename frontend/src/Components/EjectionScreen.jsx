@@ -1,5 +1,6 @@
 import React, { useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { assetUrl } from '../assets.js';
 
 export default function EjectionScreen({ result }) {
   const navigate = useNavigate();
@@ -43,7 +44,7 @@ export default function EjectionScreen({ result }) {
           result.role == "Impostor" ? 'border-red-600' : 'border-green-500'
         }`}>
           <img
-            src={`/src/assets/characters/${result.character}`}
+            src={assetUrl(`characters/${result.character}`)}
             alt={result.name}
             className="w-full h-full object-cover"
           />
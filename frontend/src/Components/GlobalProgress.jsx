@@ -1,5 +1,6 @@
 import React from 'react';
 import { useOutletContext } from 'react-router-dom';
+import { assetUrl } from '../assets.js';
 
 export default function GlobalProgress({ progress }) {
   const { character } = useOutletContext();
@@ -8,7 +9,7 @@ export default function GlobalProgress({ progress }) {
     <div className="w-full max-w-md mx-auto my-4 flex flex-col items-center gap-4">
       {/* Character Image */}
       <img
-        src={`/src/assets/characters/${character}`}
+        src={assetUrl(`characters/${character}`)}
         alt="Character"
         className="w-32 h-32"
       />
@@ -8,7 +8,7 @@ import ReportModal from './ReportModal.jsx';
 
 export default function Impostor() {
   const { session } = useSession();
-  const { globalProgress, tasks: backendTasks } = useOutletContext();
+  const { globalProgress, tasks: backendTasks, sabotage } = useOutletContext();
   const [myTasks, setMyTasks] = useState([]);
   const [progress, setProgress] = useState(0);
   const [showReportModal, setShowReportModal] = useState(false); 
@@ -83,20 +83,15 @@ export default function Impostor() {
     setTimeLeft(data.cooldown); // local timer starts fresh
   };
 
-    useEffect(() => {
-    const fetchCooldown = async () => {
-      const res = await fetch("/api/sabotage", { credentials: 'include' });
-      const data = await res.json();
-      if (data.cooldown) {
-        const cooldown = Math.floor(data.cooldown);
-        if (cooldown > 0) {
-          setCooldown(true);
-          setTimeLeft(cooldown);
-        }
-      }
-    };
-    fetchCooldown();
-  }, []);
+  // Cooldown deadline is pushed by the server with the sabotage state
+  useEffect(() => {
+    if (!sabotage?.cooldownEndsAt) return;
+    const cooldown = Math.floor(sabotage.cooldownEndsAt - Date.now() / 1000);
+    if (cooldown > 0) {
+      setCooldown(true);
+      setTimeLeft(cooldown);
+    }
+  }, [sabotage?.cooldownEndsAt]);
 
   useEffect(() => {
     if (!cooldown) return;
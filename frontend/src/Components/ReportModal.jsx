@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { useSession } from '../SessionProvider.jsx';
+import { assetUrl } from '../assets.js';
 
 function ReportModal({ players, onReport, onClose }) {
     const { session } = useSession();
@@ -27,7 +28,7 @@ function ReportModal({ players, onReport, onClose }) {
                     {/* Character image - same height as button */}
                     <div className="flex-shrink-0 w-14 h-14 rounded-full overflow-hidden border-2 border-gray-600">
                     <img 
-                        src={`src/assets/characters/${player.character}`} 
+                        src={assetUrl(`characters/${player.character}`)} 
                         alt={`${player.name}'s character`}
                         className={`w-full h-full object-cover ${player.ghost ? "grayscale" : ''}`}
                     />
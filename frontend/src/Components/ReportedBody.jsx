@@ -1,5 +1,6 @@
 import React, { useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { assetUrl } from '../assets.js';
 
 export default function ReportedBody({ character, name }) {
   const navigate = useNavigate();
@@ -21,7 +22,7 @@ export default function ReportedBody({ character, name }) {
           {/* Grayscale character image */}
           <div className="w-40 h-40 mx-auto overflow-hidden rounded-full border-4 border-gray-700">
             <img
-              src={`src/assets/characters/${character}`}
+              src={assetUrl(`characters/${character}`)}
               alt={`${name}'s character`}
               className="w-full h-full object-cover"
             />
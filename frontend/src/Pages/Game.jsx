@@ -1,9 +1,12 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Outlet, useLocation, useNavigate } from 'react-router-dom';
 import { useSocket } from '../SocketProvider';
 import { useSession } from '../SessionProvider';
 import ReportedBody from '../Components/ReportedBody.jsx';
 
+// How long to wait for the socket snapshot before falling back to HTTP polling
+const SNAPSHOT_TIMEOUT = 3000;
+
 function Game() {
   const { session } = useSession();
   const [globalProgress, setGlobalProgress] = useState(0);
@@ -14,13 +17,14 @@ function Game() {
   const location = useLocation();
   const navigate = useNavigate();
   const [tasks, setTasks] = useState([]);
-  const { addMessageListener } = useSocket();
+  const { ready, sendMessage, addMessageListener } = useSocket();
   const [reportedPlayer, setReportedPlayer] = useState({
     character: '',
     name: ''
   });
   const [report, setReport] = useState(false);
-  const [sabotageActive, setSabotageActive] = useState(false);
+  const [sabotage, setSabotage] = useState({ active: false, endsAt: null, cooldownEndsAt: null });
+  const snapshotReceived = useRef(false);
 
   useEffect(() => {
     if (session?.role && session?.character) {
@@ -29,48 +33,41 @@ function Game() {
     }
   }, [session]);
 
+  // The server pushes tasks, progress and sabotage state; ask for a fresh snapshot
+  // once, reconnects resume from the last event instead
   useEffect(() => {
-    async function fetchTasks() {
-      try {
-        const res = await fetch('/api/tasks');
-        if (!res.ok) throw new Error('Failed to fetch tasks');
-        const data = await res.json();
-        setTasks(data.tasks);
-      } catch (err) {
-        console.error(err);
-      }
+    if (ready && !snapshotReceived.current) {
+      sendMessage({ type: 'snapshot' });
     }
-    fetchTasks();
-  }, []);
-
-  
-  useEffect(() => {
-    const checkSabotage = async () => {
-      try {
-          const res = await fetch("/api/sabotage", { credentials: 'include' });
-          const data = await res.json();
-        setSabotageActive(data.active);
-      } catch (err) {
-        console.error('Failed to check sabotage:', err);
-      }
-    };
-    
-    checkSabotage();
-  }, []);
+  }, [ready, sendMessage]);
 
+  // Fallback for when the socket is down: fetch the same state over HTTP once
   useEffect(() => {
-    async function fetchProgress() {
+    const timer = setTimeout(async () => {
+      if (snapshotReceived.current) return;
       try {
-        const res = await fetch('/api/global-progress');
-        if (!res.ok) throw new Error('Failed to fetch progress');
-        const data = await res.json();
-        setGlobalProgress(data.globalProgress);
+        const [tasksRes, sabotageRes, progressRes] = await Promise.all([
+          fetch('/api/tasks'),
+          fetch('/api/sabotage', { credentials: 'include' }),
+          fetch('/api/global-progress'),
+        ]);
+        if (tasksRes.ok) setTasks((await tasksRes.json()).tasks);
+        if (sabotageRes.ok) {
+          const data = await sabotageRes.json();
+          setSabotage({
+            active: data.active,
+            endsAt: data.endsAt,
+            cooldownEndsAt: Date.now() / 1000 + data.cooldown,
+          });
+        }
+        if (progressRes.ok) setGlobalProgress((await progressRes.json()).globalProgress);
       } catch (err) {
         console.error(err);
       }
-    }
-    fetchProgress();
-  }, [navigate]);
+    }, SNAPSHOT_TIMEOUT);
+
+    return () => clearTimeout(timer);
+  }, []);
 
   // Emergency redirect
   useEffect(() => {
@@ -80,6 +77,15 @@ function Game() {
         if (location.pathname !== '/game/emergency') {
           navigate('/game/emergency');
         }
+      } else if (msg.type === 'snapshot') {
+        snapshotReceived.current = true;
+        setTasks(msg.tasks);
+        setGlobalProgress(msg.progress);
+        setSabotage(msg.sabotage);
+      } else if (msg.type === 'task_update') {
+        setTasks(prev => prev.map(t => (
+          String(t.id) === String(msg.taskId) ? { ...t, done: msg.done } : t
+        )));
       } else if (msg.type === 'global_progress') {
         console.log('Global progress update:', msg.progress);
         setGlobalProgress(msg.progress);
@@ -91,9 +97,9 @@ function Game() {
         });
       } else if (msg.type === 'game_end') {
         navigate('/game/aftergame')
-      } else if (msg.type === 'sabotage_active') {
-          setSabotageActive(true);
-        } 
+      } else if (msg.type === 'sabotage_active' || msg.type === 'sabotage_ended') {
+        setSabotage({ active: msg.active, endsAt: msg.endsAt, cooldownEndsAt: msg.cooldownEndsAt });
+      }
     });
 
     return () => removeListener();
@@ -104,7 +110,7 @@ function Game() {
       {report ? (
         <ReportedBody character={reportedPlayer.character} name={reportedPlayer.name} />
       ) : (
-        <Outlet context={{ role, character, globalProgress, vote, emergency, tasks, sabotageActive }} />
+        <Outlet context={{ role, character, globalProgress, vote, emergency, tasks, sabotage, sabotageActive: sabotage.active }} />
       )}
     </div>
   );
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useSession } from '../SessionProvider.jsx';
 import { useSocket } from '../SocketProvider.jsx';
+import { assetUrl, prefetchAssets } from '../assets.js';
 
 export default function Lobby() {
   const { session } = useSession();
@@ -57,6 +58,11 @@ export default function Lobby() {
   }, [ready, session, sendMessage]);
 
 
+  // Fetch what the game will show while everyone waits here
+  useEffect(() => {
+    prefetchAssets(players.length);
+  }, [players.length]);
+
   // Debug effect
   useEffect(() => {
     console.log('Players state changed:', players);
@@ -119,8 +125,9 @@ export default function Lobby() {
 
   return (
     <div className="min-h-screen bg-gray-900 text-white flex flex-col items-center justify-center p-4">
-      <img src="/src/assets/logo.png" alt="Game Logo" className="w-64 sm:w-80 h-auto mb-6" />
-      <h2 className="text-2xl font-bold mb-6">Lobby ({players.length}/13)</h2>
+      <img src={assetUrl('logo.png')} alt="Game Logo" className="w-64 sm:w-80 h-auto mb-6" />
+      <h2 className="text-2xl font-bold mb-2">Lobby ({players.length}/13)</h2>
+      <p className="text-lg mb-6">Room code: <span className="font-mono font-bold tracking-widest">{session?.room}</span></p>
 
       <div className="bg-gray-800 p-6 rounded-lg w-full max-w-md mb-6">
         {players.length === 0 ? (
@@ -137,6 +144,7 @@ export default function Lobby() {
                   {index === 0 && '👑 '}
                   {p.name} 
                   {p.id === playerId && ' (You)'}
+                  {p.presence === 'away' && <span className="text-gray-500"> (away)</span>}
                 </li>
             ))}
             </ul>
@@ -1,4 +1,5 @@
 import { useOutletContext, useNavigate } from 'react-router-dom';
+import { assetUrl } from '../assets.js';
 
 export default function Map() {
   const { role } = useOutletContext();
@@ -8,7 +9,7 @@ export default function Map() {
     <div className="relative w-full h-dvh overflow-hidden">
       {/* Responsive full-screen background map image */}
       <img
-        src="/src/assets/map_full.png"
+        src={assetUrl('map_full.png')}
         alt="Map"
         className="absolute top-0 left-0 w-full h-full object-contain md:object-cover"
       />
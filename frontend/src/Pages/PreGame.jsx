@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useSession } from '../SessionProvider.jsx';
 import { useSocket } from '../SocketProvider.jsx';
+import { assetUrl } from '../assets.js';
 
 export default function Pregame() {
   const { session, refreshSession } = useSession();
@@ -125,7 +126,7 @@ export default function Pregame() {
       <h2 className="text-4xl mb-6">{session.name}</h2>
       {character && (
         <img
-          src={`/src/assets/characters/${character}`}
+          src={assetUrl(`characters/${character}`)}
           alt="Character"
           className="w-48 h-48 object-contain"
         />
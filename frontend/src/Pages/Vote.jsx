@@ -4,6 +4,7 @@ import { useSession } from '../SessionProvider';
 import { useSocket } from '../SocketProvider';
 import EjectionScreen from '../Components/EjectionScreen';
 import ResultScreen from '../Components/ResultScreen';
+import { assetUrl } from '../assets.js';
 
 export default function VotePage() {
   const navigate = useNavigate();
@@ -11,6 +12,8 @@ export default function VotePage() {
   const [selectedPlayer, setSelectedPlayer] = useState(null);
   const [votes, setVotes] = useState({});
   const [timeLeft, setTimeLeft] = useState(0);
+  // Local end of the vote in ms; the server only sends it once
+  const [deadline, setDeadline] = useState(null);
   const [votingComplete, setVotingComplete] = useState(false);
   const { session } = useSession();
   const { socket, addMessageListener } = useSocket();
@@ -25,13 +28,12 @@ export default function VotePage() {
       console.log('Vote recieved', data);
       switch (data.type) {
         case 'vote_started':
-          setTimeLeft(data.time_left);
+          setDeadline(Date.now() + data.time_left * 1000);
           setVotes(data.votes || {});
           setVotingComplete(false);
           break;
-        case 'vote_update':
-          setTimeLeft(data.time_left);
-          setVotes(data.votes || {});
+        case 'vote_cast':
+          setVotes(prev => ({ ...prev, [data.voter]: data.target }));
           break;
         case 'vote_ended':
           setVotingComplete(true);
@@ -58,13 +60,18 @@ export default function VotePage() {
       }
     };
 
-    addMessageListener(handleSocketMessage);
-
-    return () => {
-      addMessageListener(handleSocketMessage);
-    };
+    return addMessageListener(handleSocketMessage);
   }, [navigate, addMessageListener]);
 
+  // Count down locally from the deadline
+  useEffect(() => {
+    if (!deadline) return;
+    const tick = () => setTimeLeft(Math.max(0, (deadline - Date.now()) / 1000));
+    tick();
+    const interval = setInterval(tick, 1000);
+    return () => clearInterval(interval);
+  }, [deadline]);
+
   // Fetch players data
   useEffect(() => {
     const fetchPlayers = async () => {
@@ -83,7 +90,7 @@ export default function VotePage() {
       try {
         const response = await fetch('/api/votes');
         const data = await response.json();
-        setTimeLeft(data.time_left);
+        setDeadline(Date.now() + data.time_left * 1000);
         setVotes(data.votes || {});
         setVotingComplete(data.game_state !== 'vote');
         if (data.game_state !== 'vote') {
@@ -174,7 +181,7 @@ export default function VotePage() {
           >
             <div className="w-16 h-16 flex-shrink-0 overflow-hidden rounded-md">
               <img
-                src={`/src/assets/characters/${player.character}`}
+                src={assetUrl(`characters/${player.character}`)}
                 alt={player.name}
                 className={`w-full h-full object-cover ${player.ghost ? 'grayscale' : ''}`}
               />
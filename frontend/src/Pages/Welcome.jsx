@@ -1,10 +1,12 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useSession } from '../SessionProvider.jsx';
+import { assetUrl } from '../assets.js';
 
 export default function Welcome() {
   const { session } = useSession();
   const [playerName, setPlayerName] = useState(session?.name || '');
+  const [roomCode, setRoomCode] = useState(session?.room || '');
   const navigate = useNavigate();
   
   const handleJoinClick = async () => {
@@ -16,9 +18,10 @@ export default function Welcome() {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         credentials: 'include',
-        body: JSON.stringify({ name }),
+        body: JSON.stringify({ name, room: roomCode.trim().toUpperCase() }),
       });
 
+      if (res.status === 404) return alert('Room not found');
       if (!res.ok) throw new Error("Join failed");
 
       navigate('/lobby');
@@ -30,7 +33,7 @@ export default function Welcome() {
   return (
     <div className="flex items-center justify-center min-h-screen bg-gray-900 text-white px-4">
       <div className="flex flex-col items-center space-y-6 w-full max-w-xs">
-        <img src="src/assets/logo.png" alt="Game Logo" className="w-32 sm:w-40 h-auto" />
+        <img src={assetUrl('logo.png')} alt="Game Logo" className="w-32 sm:w-40 h-auto" />
         <input
           type="text"
           placeholder="Your Name"
@@ -38,6 +41,14 @@ export default function Welcome() {
           onChange={(e) => setPlayerName(e.target.value)}
           className="w-full p-3 rounded bg-gray-800 border border-gray-600 focus:outline-none focus:ring-2 focus:ring-green-500 transition"
         />
+        <input
+          type="text"
+          placeholder="Room Code (empty = new room)"
+          value={roomCode}
+          maxLength={4}
+          onChange={(e) => setRoomCode(e.target.value.toUpperCase())}
+          className="w-full p-3 rounded bg-gray-800 border border-gray-600 uppercase tracking-widest focus:outline-none focus:ring-2 focus:ring-green-500 transition"
+        />
         <button
           onClick={handleJoinClick}
           className="w-full bg-green-600 hover:bg-green-700 p-3 rounded font-semibold transition"
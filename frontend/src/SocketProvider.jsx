@@ -1,6 +1,10 @@
 import React, { createContext, useContext, useEffect, useRef, useState, useCallback, useMemo } from 'react';
 import { useSession } from './SessionProvider';
 
+const RECONNECT_DELAY = 1000;
+// Must stay well under the server's HEARTBEAT_TIMEOUT (30 s)
+const HEARTBEAT_INTERVAL = 10000;
+
 const SocketContext = createContext(null);
 
 export function SocketProvider({ children }) {
@@ -8,6 +12,8 @@ export function SocketProvider({ children }) {
   const socketRef = useRef(null);
   const listenersRef = useRef(new Set()); // Using Set to avoid duplicates
   const [ready, setReady] = useState(false);
+  // Sequence number of the last event seen, sent on reconnect to resume from there
+  const lastSeqRef = useRef(null);
 
   // Stable sendMessage function
   const sendMessage = useCallback((message) => {
@@ -23,41 +29,68 @@ export function SocketProvider({ children }) {
   }, []);
 
   useEffect(() => {
+    // A different player or room starts from a snapshot, not from the old room's seq
+    lastSeqRef.current = null;
     if (!session?.player_id) return;
 
     const wsUrl = `ws://192.168.0.222:8000/ws`;
-    const ws = new WebSocket(wsUrl);
-    socketRef.current = ws;
-
-    ws.onopen = () => {
-      console.log('[WS] Connected');
-      sendMessage({
-        type: 'auth',
-        player_id: session.player_id
-      });
-    };
+    let closed = false;
+    let retryTimer;
+    const heartbeat = setInterval(() => sendMessage({ type: 'ping' }), HEARTBEAT_INTERVAL);
 
-    ws.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        console.log('[WS] Raw message:', data);
-        // Create a copy of listeners to avoid mutation during iteration
-        const currentListeners = new Set(listenersRef.current);
-        currentListeners.forEach(listener => listener(data));
-      } catch (err) {
-        console.error('[WS] Message error:', err);
-      }
+    const dispatch = (data) => {
+      if (data.seq !== undefined) lastSeqRef.current = data.seq;
+      // Create a copy of listeners to avoid mutation during iteration
+      const currentListeners = new Set(listenersRef.current);
+      currentListeners.forEach(listener => listener(data));
     };
 
-    ws.onclose = () => {
-      console.log('[WS] Disconnected');
-      setReady(false);
+    const connect = () => {
+      const ws = new WebSocket(wsUrl);
+      socketRef.current = ws;
+
+      ws.onopen = () => {
+        console.log('[WS] Connected');
+        sendMessage({
+          type: 'auth',
+          player_id: session.player_id,
+          room: session.room,
+          last_seq: lastSeqRef.current
+        });
+        setReady(true);
+      };
+
+      ws.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+          console.log('[WS] Raw message:', data);
+          if (data.type === 'resume') {
+            // Events missed while disconnected, in order
+            data.events.forEach(dispatch);
+          } else {
+            dispatch(data);
+          }
+        } catch (err) {
+          console.error('[WS] Message error:', err);
+        }
+      };
+
+      ws.onclose = () => {
+        console.log('[WS] Disconnected');
+        setReady(false);
+        if (!closed) retryTimer = setTimeout(connect, RECONNECT_DELAY);
+      };
     };
 
+    connect();
+
     return () => {
-      ws.close();
+      closed = true;
+      clearTimeout(retryTimer);
+      clearInterval(heartbeat);
+      socketRef.current?.close();
     };
-  }, [session?.player_id, sendMessage]);
+  }, [session?.player_id, session?.room, sendMessage]);
 
   // Memoize context value to prevent unnecessary re-renders
   const contextValue = useMemo(() => ({
@@ -0,0 +1,43 @@
+// Asset URLs from the backend manifest. They carry a hash of the file, so the
+// browser caches them for good; until the manifest is loaded the dev server's
+// copies are used.
+let manifest = null;
+let loading = null;
+const prefetched = new Set();
+
+export function loadManifest() {
+  if (!loading) {
+    loading = fetch('/api/assets')
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        manifest = data;
+        return data;
+      })
+      .catch(() => null);
+  }
+  return loading;
+}
+
+export function assetUrl(name) {
+  return manifest?.assets[name]?.url ?? `/src/assets/${name}`;
+}
+
+// Warm the cache with what the game will show, so game_start doesn't trigger
+// a burst of downloads. Characters are dealt as ch1..chN for N players.
+export async function prefetchAssets(players = 0) {
+  const data = await loadManifest();
+  if (!data) return;
+
+  const names = [...data.preload];
+  for (let i = 1; i <= players; i++) {
+    names.push(`characters/ch${i}.png`);
+  }
+
+  for (const name of names) {
+    const url = data.assets[name]?.url;
+    if (!url || prefetched.has(url)) continue;
+    prefetched.add(url);
+    const img = new Image();
+    img.src = url;
+  }
+}
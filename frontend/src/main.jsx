@@ -5,6 +5,9 @@ import App from './App.jsx';
 import './index.css';
 import { SessionProvider } from './SessionProvider.jsx';
 import { SocketProvider } from './SocketProvider.jsx'; // Import SocketProvider
+import { loadManifest } from './assets.js';
+
+loadManifest();
 
 ReactDOM.createRoot(document.getElementById('root')).render(
   <React.StrictMode>